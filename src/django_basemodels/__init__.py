@@ -12,4 +12,11 @@ __all__ = ["CELERY_AVAILABLE"]
 
 # Импортируем задачи, чтобы они зарегистрировались в Celery
 if CELERY_AVAILABLE:
-    from .celery import update_activity_status_task, update_model_activity_task
+    from .celery import (
+        bulk_action_task,
+        changelist_action_task,
+        merge_activity_results_task,
+        update_activity_cells_task,
+        update_activity_status_task,
+        update_model_activity_task,
+    )
@@ -0,0 +1,157 @@
+"""
+Обновление активности по нескольким базам данных и схемам арендаторов.
+
+Цели обновления задаются настройками:
+  - BASEMODELS_ACTIVITY_DATABASES — список алиасов баз (по умолчанию ["default"]);
+  - BASEMODELS_ACTIVITY_SCHEMAS — список схем PostgreSQL (schema-per-tenant) или dotted-path
+    к функции, которая его возвращает; по умолчанию схемы не переключаются;
+  - BASEMODELS_ACTIVITY_SCHEMA_CONTEXT — dotted-path к контекстному менеджеру (using, schema),
+    который переключает схему (например, для django-tenants); по умолчанию меняется search_path;
+  - BASEMODELS_ACTIVITY_CONCURRENCY — сколько ячеек (цель, модель) обновляется одновременно.
+
+Каждая ячейка обновляется изолированно: ошибка одной схемы или базы не прерывает остальные,
+а попадает в матрицу результатов {цель: {модель: число изменённых объектов или {"error": ...}}}.
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.module_loading import import_string
+
+from .utils import get_models_with_activity
+
+logger = logging.getLogger(__name__)
+
+
+def get_activity_targets():
+    """Возвращает список целей обновления (alias, schema); schema равна None без переключения схем."""
+    aliases = getattr(settings, "BASEMODELS_ACTIVITY_DATABASES", None) or [DEFAULT_DB_ALIAS]
+    schemas = getattr(settings, "BASEMODELS_ACTIVITY_SCHEMAS", None)
+    if isinstance(schemas, str):
+        schemas = import_string(schemas)()
+
+    if not schemas:
+        return [(alias, None) for alias in aliases]
+    return [(alias, schema) for alias in aliases for schema in schemas]
+
+
+def get_activity_cells(models=None, targets=None):
+    """Возвращает все ячейки (alias, schema, model_label) для обновления."""
+    if models is None:
+        models = get_models_with_activity()
+    if targets is None:
+        targets = get_activity_targets()
+
+    labels = [model._meta.label_lower for model in models]
+    return [(alias, schema, label) for alias, schema in targets for label in labels]
+
+
+def target_label(using: str, schema=None) -> str:
+    return f"{using}:{schema}" if schema else using
+
+
+@contextmanager
+def search_path_schema(using: str, schema: str):
+    """Переключает search_path соединения using на схему schema на время блока (только PostgreSQL)."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        raise ValueError(f"Schema switching is not supported for {connection.vendor} database {using!r}")
+
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW search_path")
+        previous = cursor.fetchone()[0]
+        cursor.execute(f"SET search_path TO {connection.ops.quote_name(schema)}, public")
+    try:
+        yield
+    except BaseException:
+        # Исходная ошибка важнее: восстановление в прерванной транзакции само упадёт
+        _restore_search_path(connection, previous, raise_errors=False)
+        raise
+    _restore_search_path(connection, previous)
+
+
+def _restore_search_path(connection, previous: str, raise_errors: bool = True):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {previous}")
+    except Exception as exc:
+        if raise_errors:
+            raise
+        logger.warning(f"Failed to restore search_path on {connection.alias!r}", exc_info=exc)
+        if connection.in_atomic_block:
+            # SET внутри транзакции отменяется её откатом — гарантируем, что она будет откачена
+            connection.set_rollback(True)
+        else:
+            # Иначе соединение осталось бы на схеме арендатора: следующий запрос откроет новое
+            connection.close()
+
+
+@contextmanager
+def use_schema(using: str, schema=None):
+    if schema is None:
+        yield
+        return
+
+    schema_context = getattr(settings, "BASEMODELS_ACTIVITY_SCHEMA_CONTEXT", None)
+    schema_context = import_string(schema_context) if schema_context else search_path_schema
+    with schema_context(using, schema):
+        yield
+
+
+def update_model_activity(model_label: str, using: str = DEFAULT_DB_ALIAS, schema=None) -> int:
+    """Обновляет активность одной модели в базе using и схеме schema."""
+    model = apps.get_model(model_label)
+    with use_schema(using, schema):
+        return model.objects.db_manager(using).update_activity_status()
+
+
+def update_activity_cells(cells):
+    """
+    Последовательно обновляет ячейки (alias, schema, model_label), изолируя ошибки каждой.
+    Возвращает матрицу результатов.
+    """
+    results = defaultdict(dict)
+    for using, schema, label in cells:
+        try:
+            results[target_label(using, schema)][label] = update_model_activity(label, using, schema)
+        except Exception as exc:
+            logger.error(f"Error updating activity for {label} on {target_label(using, schema)}", exc_info=exc)
+            results[target_label(using, schema)][label] = {"error": str(exc)}
+    return dict(results)
+
+
+def split_cells(cells, parts: int):
+    """Раскладывает ячейки по кругу на не более чем parts пачек."""
+    batches = [cells[i::parts] for i in range(parts)]
+    return [batch for batch in batches if batch]
+
+
+def refresh_activity(models=None, targets=None, concurrency=None):
+    """
+    Обновляет активность всех моделей во всех целях внутри процесса,
+    не более чем concurrency ячеек одновременно. Возвращает матрицу результатов.
+    """
+    if concurrency is None:
+        concurrency = getattr(settings, "BASEMODELS_ACTIVITY_CONCURRENCY", None) or 1
+
+    cells = get_activity_cells(models, targets)
+    if concurrency <= 1 or len(cells) <= 1:
+        return update_activity_cells(cells)
+
+    def run(batch):
+        try:
+            return update_activity_cells(batch)
+        finally:
+            connections.close_all()
+
+    results = defaultdict(dict)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for partial in executor.map(run, split_cells(cells, concurrency)):
+            for target, row in partial.items():
+                results[target].update(row)
+    return dict(results)
@@ -1,5 +1,18 @@
+from django import forms
+from django.contrib import messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.sites import all_sites
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.http import HttpRequest, QueryDict
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _lazy
 from safedelete.admin import SafeDeleteAdmin, SafeDeleteAdminFilter, highlight_deleted
 
+from . import CELERY_AVAILABLE
+from .utils import celery_is_healthy, estimate_count, iter_pk_chunks, run_bulk_action
+
 
 class BaseModelAdmin(SafeDeleteAdmin):
     list_display = ((highlight_deleted, "highlight_deleted_field")
@@ -7,3 +20,180 @@ class BaseModelAdmin(SafeDeleteAdmin):
                     + ("is_active", "created_at", "updated_at"))
     list_filter = (SafeDeleteAdminFilter,) + SafeDeleteAdmin.list_filter
     field_to_highlight = "id"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор, который берёт число строк из статистики планировщика БД.
+    Точный COUNT(*) выполняется только для небольших выборок или если оценка недоступна.
+    """
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimated = estimate_count(self.object_list)
+        if estimated is None or estimated < self.exact_count_threshold:
+            return super().count
+        return estimated
+
+
+class KeysetChangeList(ChangeList):
+    """
+    Changelist с keyset-пагинацией ("загрузить ещё") по убыванию pk вместо OFFSET-страниц.
+    Курсор передаётся в параметре запроса CURSOR_VAR и содержит pk последней показанной строки.
+    Для действий админки курсор не применяется: "выбрать все" относится ко всей отфильтрованной выборке.
+    """
+    CURSOR_VAR = "after"
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(self.CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Любая смена фильтров/поиска начинает выдачу с начала
+        return super().get_query_string(new_params, [*(remove or ()), self.CURSOR_VAR])
+
+    def get_queryset(self, request, exclude_parameters=None):
+        qs = self.uncursored_queryset = super().get_queryset(request, exclude_parameters)
+
+        cursor = request.GET.get(self.CURSOR_VAR)
+        if cursor and not self.is_action_request(request):
+            try:
+                cursor = self.lookup_opts.pk.to_python(cursor)
+            except ValidationError as exc:
+                raise IncorrectLookupParameters(exc)
+            qs = qs.filter(pk__lt=cursor)
+
+        return qs
+
+    @staticmethod
+    def is_action_request(request):
+        # POST changelist без "_save" (list_editable) — запуск или подтверждение действия
+        return request.method == "POST" and "_save" not in request.POST
+
+    def get_results(self, request):
+        # Число строк считаем по всей отфильтрованной выборке, а не по остатку после курсора
+        paginator = self.model_admin.get_paginator(request, self.uncursored_queryset, self.list_per_page)
+
+        # Лишняя строка показывает, есть ли следующая страница, без отдельного запроса
+        rows = list(self.queryset[:self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[:self.list_per_page]
+
+        self.result_count = paginator.count
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = paginator
+        self.next_page_url = self.get_query_string({self.CURSOR_VAR: rows[-1].pk}) if has_more else None
+
+
+class HighScaleBaseModelAdmin(BaseModelAdmin):
+    """
+    Админка BaseModel для очень больших таблиц:
+      - оценочное число строк вместо точного COUNT(*), без второго подсчёта всей таблицы;
+      - changelist без полиморфного апкаста строк;
+      - keyset-пагинация "загрузить ещё" по индексированному pk вместо сортировки по updated_at;
+      - массовые activate/deactivate/soft_delete пачками в фоновых задачах Celery.
+    """
+    change_list_template = "admin/django_basemodels/keyset_change_list.html"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-pk",)
+    sortable_by = ()
+    actions = ("activate_in_background", "deactivate_in_background", "soft_delete_in_background")
+    bulk_action_chunk_size = 1000
+    # Без Celery в запросе обрабатывается не больше стольких объектов, иначе действие отклоняется
+    inline_bulk_action_limit = 10000
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).non_polymorphic()
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_action_query_string(self, request):
+        """Строка запроса changelist (фильтры и поиск) без курсора пагинации."""
+        params = request.GET.copy()
+        params.pop(KeysetChangeList.CURSOR_VAR, None)
+        return params.urlencode()
+
+    def get_action_queryset(self, query_string, user):
+        """
+        Восстанавливает отфильтрованную выборку changelist по строке запроса и пользователю.
+        Используется фоновой задачей для действий над "всеми выбранными".
+        """
+        request = HttpRequest()
+        request.GET = QueryDict(query_string)
+        request.user = user
+        return self.get_changelist_instance(request).queryset
+
+    def schedule_bulk_action(self, request, queryset, action):
+        """
+        Выполняет action для выбранных объектов пачками по bulk_action_chunk_size.
+        При работающем Celery ставится одна фоновая задача: для "выбрать все" она получает фильтры changelist
+        и сама обходит выборку пачками по pk, иначе — отмеченные на странице pk.
+        Без Celery операция выполняется в запросе, только если выбрано не больше inline_bulk_action_limit объектов.
+        """
+        model_label = self.model._meta.label_lower
+
+        if CELERY_AVAILABLE and celery_is_healthy():
+            from .celery import bulk_action_task, changelist_action_task
+
+            # "Выбрать все" (select_across): действие относится ко всей отфильтрованной выборке changelist
+            if forms.BooleanField(required=False).to_python(request.POST.get("select_across")):
+                changelist_action_task.delay(
+                    self.admin_site.name, model_label, action, self.get_action_query_string(request), request.user.pk
+                )
+            else:
+                bulk_action_task.delay(model_label, action, list(queryset.unordered().values_list("pk", flat=True)))
+            self.message_user(request, _lazy("Операция запущена в фоновой задаче"))
+            return
+
+        limit = self.inline_bulk_action_limit
+        if queryset.unordered()[:limit + 1].count() > limit:
+            self.message_user(
+                request,
+                _lazy("Celery недоступен, а выбрано больше %(limit)s объектов: операция не выполнена. "
+                      "Сузьте выборку или повторите позже.") % {"limit": limit},
+                level=messages.ERROR,
+            )
+            return
+
+        chunks = 0
+        for chunk in iter_pk_chunks(queryset, self.bulk_action_chunk_size):
+            run_bulk_action(self.model, action, chunk)
+            chunks += 1
+
+        self.message_user(
+            request,
+            _lazy("Celery недоступен, операция выполнена в запросе пачками: %(chunks)s") % {"chunks": chunks},
+            level=messages.WARNING,
+        )
+
+    def activate_in_background(self, request, queryset):
+        self.schedule_bulk_action(request, queryset, "activate")
+
+    activate_in_background.short_description = _lazy("Активировать выбранные (в фоне)")
+
+    def deactivate_in_background(self, request, queryset):
+        self.schedule_bulk_action(request, queryset, "deactivate")
+
+    deactivate_in_background.short_description = _lazy("Деактивировать выбранные (в фоне)")
+
+    def soft_delete_in_background(self, request, queryset):
+        self.schedule_bulk_action(request, queryset, "soft_delete")
+
+    soft_delete_in_background.short_description = _lazy("Мягко удалить выбранные (в фоне)")
+
+
+def get_model_admin(site_name, model):
+    """Возвращает ModelAdmin модели на сайте админки с именем site_name."""
+    for site in all_sites:
+        if site.name == site_name:
+            return site.get_model_admin(model)
+    raise LookupError(f"Admin site {site_name!r} is not registered")
@@ -3,6 +3,8 @@ import logging
 from django.apps import AppConfig, apps
 from django.conf import settings
 from django.core.checks import Error, register
+from django.core.signals import request_started
+from django.db.models.signals import post_migrate
 from django.utils.translation import gettext_lazy as _lazy
 
 from . import CELERY_AVAILABLE
@@ -18,6 +20,7 @@ class DjangoBaseModelsAppConfig(AppConfig):
 
     def ready(self):
         self._register_celery_handlers()
+        self._register_ctype_warmup()
 
     def _register_celery_handlers(self):
         """Регистрируем обработчики для Celery только если он доступен"""
@@ -33,6 +36,31 @@ class DjangoBaseModelsAppConfig(AppConfig):
         except ImportError as e:
             logger.debug("Celery not available for signal registration: %s", e)
 
+    def _register_ctype_warmup(self):
+        """
+        Карта ContentType строится лениво при первой полиморфной загрузке и сбрасывается после миграций.
+        При BASEMODELS_WARM_CTYPES = True она прогревается заранее: на первом запросе и при старте воркера Celery.
+        """
+        from .contenttypes import clear_ctype_maps
+
+        post_migrate.connect(clear_ctype_maps, dispatch_uid="django_basemodels.clear_ctype_maps")
+
+        if not getattr(settings, "BASEMODELS_WARM_CTYPES", False):
+            return
+
+        request_started.connect(self._warm_ctypes, dispatch_uid="django_basemodels.warm_ctypes")
+        if CELERY_AVAILABLE:
+            from celery.signals import worker_process_init
+
+            worker_process_init.connect(self._warm_ctypes, weak=False)
+
+    def _warm_ctypes(self, **kwargs):
+        """Однократно прогреваем карту ContentType без обращения к БД на этапе импорта"""
+        from .contenttypes import warm_ctypes
+
+        request_started.disconnect(dispatch_uid="django_basemodels.warm_ctypes")
+        warm_ctypes()
+
     def _create_periodic_task(self):
         """
         Создаем периодическую задачу когда Celery сконфигурирован.
@@ -5,27 +5,34 @@ This module is only used when Celery extras are installed.
 
 import logging
 
-from celery import group, shared_task
+from celery import chord, group, shared_task
+from celery.backends.base import DisabledBackend
 from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
 
-logger = logging.getLogger(__name__)
+from .activity import (
+    get_activity_cells,
+    get_activity_targets,
+    split_cells,
+    update_activity_cells,
+    update_model_activity,
+)
+from .utils import get_models_with_activity, iter_pk_chunks, run_bulk_action
 
+logger = logging.getLogger(__name__)
 
-def get_models_with_activity():
-    """Генератор моделей, которые наследуются от BaseModel и имеют активность"""
-    from .models import BaseModel
 
-    for model in apps.get_models():
-        if issubclass(model, BaseModel) and not model._meta.abstract and not model._meta.proxy:
-            yield model
+def results_backend_enabled() -> bool:
+    """True, если у приложения Celery настроен result backend (нужен для chord)."""
+    return not isinstance(update_activity_status_task.app.backend, DisabledBackend)
 
 
 @shared_task(name="django_basemodels.update_model_activity")
-def update_model_activity_task(model_label: str):
-    """Задача для обновления активности конкретной модели"""
+def update_model_activity_task(model_label: str, using: str = DEFAULT_DB_ALIAS, schema: str = None):
+    """Задача для обновления активности конкретной модели в базе using и схеме schema"""
     try:
-        model = apps.get_model(model_label)
-        updated = model.objects.update_activity_status()
+        updated = update_model_activity(model_label, using, schema)
         logger.debug(f"[{model_label}] Updated {updated} objects")
         return updated
     except Exception as e:
@@ -33,17 +40,94 @@ def update_model_activity_task(model_label: str):
         raise
 
 
+@shared_task(name="django_basemodels.update_activity_cells")
+def update_activity_cells_task(cells: list):
+    """Задача для последовательного обновления пачки ячеек (alias, schema, model_label) с изоляцией ошибок"""
+    results = update_activity_cells([tuple(cell) for cell in cells])
+    logger.debug(f"Updated activity for {len(cells)} cells")
+    return results
+
+
+@shared_task(name="django_basemodels.merge_activity_results")
+def merge_activity_results_task(results: list):
+    """Callback chord: собирает матрицу {цель: {модель: результат}} из матриц задач группы"""
+    matrix = {}
+    for partial in results:
+        for target, row in partial.items():
+            matrix.setdefault(target, {}).update(row)
+
+    failed = [
+        f"{target}:{label}" for target, row in matrix.items() for label, result in row.items()
+        if isinstance(result, dict) and "error" in result
+    ]
+    if failed:
+        logger.warning(f"Activity update failed for {len(failed)} cells: {', '.join(failed)}")
+    logger.info(f"Activity update finished on {len(matrix)} targets")
+    return matrix
+
+
 @shared_task(name="django_basemodels.update_activity_status")
 def update_activity_status_task():
-    """Основная задача для обновления активности всех моделей"""
-    tasks = []
-    for model in get_models_with_activity():
-        tasks.append(update_model_activity_task.s(model._meta.label_lower))
+    """
+    Основная задача для обновления активности всех моделей во всех базах и схемах.
+    Без BASEMODELS_ACTIVITY_CONCURRENCY запускает по задаче на ячейку (база/схема, модель),
+    с ним — не более BASEMODELS_ACTIVITY_CONCURRENCY задач, каждая обновляет свою пачку ячеек.
+    Если настроен result backend, задачи запускаются chord'ом, и матрица результатов — результат
+    задачи merge_activity_results; без него результаты задач не собираются.
+    """
+    models = list(get_models_with_activity())
+    targets = get_activity_targets()
+    cells = get_activity_cells(models, targets)
+    concurrency = getattr(settings, "BASEMODELS_ACTIVITY_CONCURRENCY", None)
+
+    batches = split_cells(cells, concurrency) if concurrency else [[cell] for cell in cells]
+    tasks = [update_activity_cells_task.s(batch) for batch in batches]
 
     if tasks:
-        group(tasks).apply_async()
-        logger.info(f"Started activity update for {len(tasks)} models")
-        return f"Started update for {len(tasks)} models"
+        if results_backend_enabled():
+            chord(tasks)(merge_activity_results_task.s())
+        else:
+            group(tasks).apply_async()
+        logger.info(f"Started activity update for {len(models)} models on {len(targets)} targets")
+        return f"Started update for {len(models)} models on {len(targets)} targets"
     else:
         logger.debug("No models found for activity update")
         return "No models to update"
+
+
+@shared_task(name="django_basemodels.bulk_action")
+def bulk_action_task(model_label: str, action: str, pks: list):
+    """Задача для выполнения массовой операции над одной пачкой объектов"""
+    try:
+        model = apps.get_model(model_label)
+        updated = run_bulk_action(model, action, pks)
+        logger.debug(f"[{model_label}] {action}: {updated} objects")
+        return updated
+    except Exception as e:
+        logger.error(f"Error running {action} for {model_label}: {e}")
+        raise
+
+
+@shared_task(name="django_basemodels.changelist_action")
+def changelist_action_task(site_name: str, model_label: str, action: str, query_string: str, user_pk):
+    """
+    Задача для выполнения массовой операции над отфильтрованной выборкой changelist админки.
+    Выборка восстанавливается по строке запроса и пользователю и обходится пачками по pk.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .admin import get_model_admin
+
+    try:
+        model = apps.get_model(model_label)
+        model_admin = get_model_admin(site_name, model)
+        queryset = model_admin.get_action_queryset(query_string, get_user_model()._default_manager.get(pk=user_pk))
+
+        updated = 0
+        for pks in iter_pk_chunks(queryset, model_admin.bulk_action_chunk_size):
+            updated += run_bulk_action(model, action, pks)
+        logger.debug(f"[{model_label}] {action}: {updated} objects")
+        return updated
+    except Exception as e:
+        logger.error(f"Error running {action} for {model_label}: {e}")
+        raise
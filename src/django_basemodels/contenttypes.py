@@ -0,0 +1,77 @@
+"""
+Закреплённые ContentType для полиморфной загрузки BaseModel.
+
+django-polymorphic определяет реальный класс строки по polymorphic_ctype_id через кэш
+ContentType.objects. В каждом новом процессе (и после ContentType.objects.clear_cache() в тестах)
+этот кэш пуст, и первые запросы делают по запросу к ContentType на каждый подкласс.
+Здесь один раз на процесс и базу строится неизменяемая карта ctype_id -> ContentType для всех
+моделей из get_models_with_activity(), и перед полиморфной загрузкой её записи возвращаются в кэш.
+"""
+
+import logging
+import threading
+from types import MappingProxyType
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS
+
+from .utils import get_models_with_activity
+
+logger = logging.getLogger(__name__)
+
+_ctype_maps = {}
+_lock = threading.Lock()
+
+
+def get_ctype_map(using: str = DEFAULT_DB_ALIAS):
+    """
+    Возвращает неизменяемую карту ctype_id -> ContentType для базы using.
+    Карта строится лениво при первом обращении одним запросом к ContentType.
+    """
+    ctype_map = _ctype_maps.get(using)
+    if ctype_map is not None:
+        return ctype_map
+
+    with _lock:
+        ctype_map = _ctype_maps.get(using)
+        if ctype_map is None:
+            ctypes = ContentType.objects.db_manager(using).get_for_models(
+                *get_models_with_activity(), for_concrete_models=False
+            )
+            ctype_map = MappingProxyType({ctype.pk: ctype for ctype in ctypes.values()})
+            _ctype_maps[using] = ctype_map
+    return ctype_map
+
+
+def get_ctype_models(using: str = DEFAULT_DB_ALIAS):
+    """Возвращает неизменяемую карту ctype_id -> класс модели для базы using."""
+    return MappingProxyType({pk: ctype.model_class() for pk, ctype in get_ctype_map(using).items()})
+
+
+def model_for_ctype(ctype_id, using: str = DEFAULT_DB_ALIAS, default=None):
+    """Класс модели по polymorphic_ctype_id через кэш ContentType; default, если его нет."""
+    if ctype_id is None:
+        return default
+    return ContentType.objects.db_manager(using).get_for_id(ctype_id).model_class() or default
+
+
+def pin_ctypes(using: str = DEFAULT_DB_ALIAS):
+    """Возвращает закреплённые ContentType в кэш ContentType.objects, если он был очищен."""
+    cache = ContentType.objects._cache.get(using, {})
+    for pk, ctype in get_ctype_map(using).items():
+        if pk not in cache:
+            ContentType.objects._add_to_cache(using, ctype)
+
+
+def warm_ctypes(using: str = DEFAULT_DB_ALIAS, **kwargs):
+    """Строит карту заранее. Подходит как обработчик сигнала (например, request_started)."""
+    try:
+        pin_ctypes(using)
+    except Exception as exc:
+        logger.error("Failed to warm BaseModel content types", exc_info=exc)
+
+
+def clear_ctype_maps(**kwargs):
+    """Сбрасывает карты, например после миграций, когда id ContentType могут измениться."""
+    with _lock:
+        _ctype_maps.clear()
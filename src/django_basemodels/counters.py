@@ -0,0 +1,156 @@
+"""
+Счётчики активных и неактивных объектов по моделям.
+
+Счётчики хранятся в кэше Django (BASEMODELS_ACTIVITY_COUNTERS_CACHE, по умолчанию "default")
+отдельно для каждой базы и модели и описывают видимые через objects (не удалённые) строки по флагу
+is_active. Они корректируются инкрементально при создании, сохранении, activate()/deactivate(), мягком
+удалении и update_activity_status() — по реальной (полиморфной) модели каждой строки, поэтому массовое
+изменение через queryset предка корректирует и счётчики потомков. Корректировки применяются только после
+фиксации транзакции; массовые операции считают их по строкам, заблокированным и изменённым пачкой. Раз в BASEMODELS_ACTIVITY_COUNTERS_MAX_AGE секунд пересчитываются
+точно — это ограничивает накопленное расхождение (например, от изменений в обход BaseModel API).
+
+Включаются настройкой BASEMODELS_ACTIVITY_COUNTERS = True; без неё корректировки ничего не делают,
+а active_count()/inactive_count() выполняют обычный COUNT. Со схемами тенантов
+(BASEMODELS_ACTIVITY_SCHEMAS) счётчики не поддерживаются: ключи кэша не различают схемы.
+"""
+
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import models, transaction
+from safedelete.config import DELETED_INVISIBLE
+
+from .contenttypes import model_for_ctype
+from .utils import estimate_count
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "django_basemodels:counters"
+
+
+def counters_enabled() -> bool:
+    if not getattr(settings, "BASEMODELS_ACTIVITY_COUNTERS", False):
+        return False
+    if getattr(settings, "BASEMODELS_ACTIVITY_SCHEMAS", None):
+        # Ключи счётчиков не различают схемы: счётчики тенантов одной базы смешались бы
+        raise ImproperlyConfigured(
+            "BASEMODELS_ACTIVITY_COUNTERS cannot be used together with BASEMODELS_ACTIVITY_SCHEMAS"
+        )
+    return True
+
+
+def _get_cache():
+    return caches[getattr(settings, "BASEMODELS_ACTIVITY_COUNTERS_CACHE", "default")]
+
+
+def _keys(model, using: str):
+    prefix = f"{KEY_PREFIX}:{using}:{model._meta.concrete_model._meta.label_lower}"
+    return f"{prefix}:active", f"{prefix}:inactive", f"{prefix}:at"
+
+
+def _counted_models(model):
+    """Модель и её конкретные предки-BaseModel: строка потомка учитывается и в счётчиках предков."""
+    from .models import BaseModel
+
+    concrete_model = model._meta.concrete_model
+    return [concrete_model] + [
+        parent for parent in concrete_model._meta.get_parent_list() if issubclass(parent, BaseModel)
+    ]
+
+
+def adjust(model, using: str, active: int = 0, inactive: int = 0):
+    """
+    Корректирует счётчики model и её предков после фиксации текущей транзакции базы using,
+    поэтому откат транзакции счётчики не меняет. Отсутствующие счётчики не создаются.
+    """
+    if not counters_enabled() or not (active or inactive):
+        return
+
+    transaction.on_commit(lambda: _incr(model, using, active, inactive), using=using)
+
+
+def _incr(model, using: str, active: int, inactive: int):
+    cache = _get_cache()
+    for counted_model in _counted_models(model):
+        active_key, inactive_key, _at_key = _keys(counted_model, using)
+        try:
+            for key, delta in ((active_key, active), (inactive_key, inactive)):
+                if delta:
+                    cache.incr(key, delta)
+        except ValueError:
+            # Счётчика ещё нет — он будет посчитан точно при первом чтении
+            continue
+        except Exception as exc:
+            logger.error("Error adjusting activity counters", exc_info=exc)
+
+
+def adjust_for_rows(model, using: str, rows, is_active=None, removed: bool = False):
+    """
+    Корректирует счётчики по строкам queryset модели model, изменённым массовой операцией:
+    перевод в is_active или удаление (removed). rows — пары (polymorphic_ctype_id, is_active)
+    строк, которые до изменения не были удалены, прочитанные под блокировкой в той же транзакции.
+    """
+    if not counters_enabled():
+        return
+
+    for (ctype_id, was_active), count in Counter(rows).items():
+        if removed:
+            active, inactive = (-count, 0) if was_active else (0, -count)
+        elif was_active == is_active:
+            continue
+        else:
+            active = count if is_active else -count
+            inactive = -active
+        adjust(model_for_ctype(ctype_id, using, model), using, active=active, inactive=inactive)
+
+
+def get_counts(model, using: str, max_age: float):
+    """Возвращает {"active": n, "inactive": n} из кэша или None, если счётчиков нет или они устарели."""
+    active_key, inactive_key, at_key = _keys(model, using)
+    values = _get_cache().get_many([active_key, inactive_key, at_key])
+    if len(values) < 3 or time.time() - values[at_key] > max_age:
+        return None
+    return {"active": values[active_key], "inactive": values[inactive_key]}
+
+
+def recount(queryset):
+    """Точно пересчитывает счётчики по queryset одним запросом и сохраняет их."""
+    counts = queryset.unordered().aggregate(
+        active=models.Count("pk", filter=models.Q(is_active=True)),
+        inactive=models.Count("pk", filter=models.Q(is_active=False)),
+    )
+    active_key, inactive_key, at_key = _keys(queryset.model, queryset.db)
+    _get_cache().set_many(
+        {active_key: counts["active"], inactive_key: counts["inactive"], at_key: time.time()},
+        timeout=None,
+    )
+    return counts
+
+
+def activity_count(queryset, is_active: bool, approx: bool = False, max_age: float = None) -> int:
+    """
+    Число активных (is_active=True) или неактивных объектов queryset.
+      - approx=True: оценка планировщика PostgreSQL; на других СУБД — как approx=False;
+      - иначе: счётчик из кэша, если он не старше max_age секунд, иначе точный пересчёт.
+    Счётчики используются только для менеджера objects; для прочих queryset выполняется COUNT.
+    """
+    if approx:
+        estimated = estimate_count(queryset.filter(is_active=is_active))
+        if estimated is not None:
+            return estimated
+
+    visibility = getattr(queryset.query, "_safedelete_force_visibility", None)
+    if visibility is None:
+        visibility = getattr(queryset.query, "_safedelete_visibility", None)
+    if not counters_enabled() or queryset.query.where or visibility != DELETED_INVISIBLE:
+        return queryset.filter(is_active=is_active).count()
+
+    if max_age is None:
+        max_age = getattr(settings, "BASEMODELS_ACTIVITY_COUNTERS_MAX_AGE", 300)
+
+    counts = get_counts(queryset.model, queryset.db, max_age) or recount(queryset)
+    return counts["active" if is_active else "inactive"]
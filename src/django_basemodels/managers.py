@@ -5,6 +5,7 @@ from polymorphic.managers import PolymorphicManager
 from safedelete.config import DELETED_INVISIBLE
 from safedelete.managers import SafeDeleteManager
 
+from . import counters
 from .query import BaseModelQuerySet
 
 
@@ -49,11 +50,37 @@ class BaseModelManager(SafeDeleteManager, PolymorphicManager):
     def deactivate(self):
         return self.get_queryset().deactivate()
 
-    def active(self):
-        return self.get_queryset().active()
+    def soft_delete(self):
+        return self.get_queryset().soft_delete()
 
-    def inactive(self):
-        return self.get_queryset().inactive()
+    def active(self, now=None):
+        return self.get_queryset().active(now=now)
+
+    def inactive(self, now=None):
+        return self.get_queryset().inactive(now=now)
+
+    def prefetch_active(self, *relations, now=None):
+        return self.get_queryset().prefetch_active(*relations, now=now)
+
+    def active_count(self, approx=False, max_age=None):
+        """
+        Число активных объектов по флагу is_active. approx=True — оценка планировщика (PostgreSQL),
+        иначе счётчик не старше max_age секунд или точный подсчёт (см. django_basemodels.counters).
+        """
+        return counters.activity_count(self.get_queryset(), True, approx=approx, max_age=max_age)
+
+    def inactive_count(self, approx=False, max_age=None):
+        """Число неактивных объектов по флагу is_active, см. active_count()."""
+        return counters.activity_count(self.get_queryset(), False, approx=approx, max_age=max_age)
+
+    def bulk_create(self, objs, batch_size=None, **kwargs):
+        return self.get_queryset().bulk_create(objs, batch_size=batch_size, **kwargs)
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        return self.get_queryset().bulk_update(objs, fields, batch_size=batch_size)
+
+    def changes_since(self, cursor=None, limit=1000):
+        return self.get_queryset().changes_since(cursor=cursor, limit=limit)
 
     def update_activity_status(self, batch_size=1000):
         return self.get_queryset().update_activity_status(batch_size=batch_size)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityTransition',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('object_pk', models.CharField(max_length=64, verbose_name='Первичный ключ объекта')),
+                ('is_active', models.BooleanField(verbose_name='Активность')),
+                ('at', models.DateTimeField(verbose_name='Время изменения')),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='contenttypes.contenttype', verbose_name='Тип объекта')),
+            ],
+            options={
+                'verbose_name': 'Смена активности',
+                'verbose_name_plural': 'Смены активности',
+            },
+        ),
+    ]
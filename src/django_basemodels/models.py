@@ -1,5 +1,7 @@
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.signals import class_prepared
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _lazy
 from polymorphic.models import PolymorphicModel
@@ -7,16 +9,22 @@ from safedelete.config import DELETED_ONLY_VISIBLE, DELETED_VISIBLE, HARD_DELETE
 from safedelete.config import FIELD_NAME as SAFEDELETE_FIELD_NAME
 from safedelete.models import SafeDeleteModel
 
+from . import counters, outbox, profiling
 from .managers import BaseModelManager
+from .refresher import activity_is_fresh
 from .utils import celery_is_healthy
 
+# Состояние объекта для счётчиков не известно: is_active или поле удаления отложены
+_UNKNOWN = object()
+
 
 class BaseModel(SafeDeleteModel, PolymorphicModel):
     _safedelete_policy = HARD_DELETE
 
     class Meta:
         abstract = True
-        ordering = ['-updated_at']
+        # Совпадает с индексом (updated_at, pk): сортировка читается по индексу, без sort всей выборки
+        ordering = ['-updated_at', '-pk']
         indexes = [
             # Для запросов типа .filter(is_active=True)
             models.Index(fields=['is_active']),
@@ -33,6 +41,9 @@ class BaseModel(SafeDeleteModel, PolymorphicModel):
             models.Index(fields=['active_end']),
             models.Index(fields=['polymorphic_ctype']),
             models.Index(fields=[SAFEDELETE_FIELD_NAME]),
+
+            # Индекс (updated_at, pk) добавляется конкретной модели в add_keyset_index():
+            # первичный ключ наследника может называться не id
         ]
 
     created_at = models.DateTimeField(
@@ -67,6 +78,70 @@ class BaseModel(SafeDeleteModel, PolymorphicModel):
 
         super().clean()
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._counted_is_active = self._counted_state()
+
+    def _counted_state(self):
+        """
+        Вклад объекта в счётчики активности: is_active для не удалённого объекта, None для удалённого,
+        _UNKNOWN, если поля отложены (only()/defer()) и состояние без лишнего запроса не узнать.
+        """
+        if "is_active" not in self.__dict__ or SAFEDELETE_FIELD_NAME not in self.__dict__:
+            return _UNKNOWN
+        if getattr(self, SAFEDELETE_FIELD_NAME) is not None:
+            return None
+        return self.is_active
+
+    def _adjust_counters(self, previous, current):
+        if previous is _UNKNOWN or current is _UNKNOWN or previous == current:
+            return
+        counters.adjust(
+            type(self), self._state.db,
+            active=int(current is True) - int(previous is True),
+            inactive=int(current is False) - int(previous is False),
+        )
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._counted_is_active = self._counted_state()
+
+    def save(self, *args, **kwargs):
+        previous = None if self._state.adding else self._counted_is_active
+        if not outbox.outbox_enabled():
+            self._save_and_track(previous, *args, **kwargs)
+            return
+
+        # Переход is_active записывается в outbox в той же транзакции, что и сохранение
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            if self._save_and_track(previous, *args, **kwargs):
+                outbox.record_transitions(type(self), [self.pk], self.is_active, self.updated_at, self._state.db)
+
+    def _save_and_track(self, previous, *args, **kwargs):
+        """
+        Сохраняет объект и корректирует счётчики.
+        Возвращает True, если сохранение сменило is_active не удалённого объекта.
+        """
+        super().save(*args, **kwargs)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"is_active", SAFEDELETE_FIELD_NAME} & set(update_fields):
+            return False
+        current = self._counted_is_active = self._counted_state()
+        self._adjust_counters(previous, current)
+        return isinstance(previous, bool) and isinstance(current, bool) and previous != current
+
+    def delete(self, *args, **kwargs):
+        previous = self._counted_is_active
+        result = super().delete(*args, **kwargs)
+
+        # Мягкое удаление и его откат учитываются в save(), здесь — только физическое удаление
+        if self.pk is None:
+            self._counted_is_active = None
+            self._adjust_counters(previous, None)
+        return result
+
     def activate(self):
         self.is_active = True
         self.save(update_fields=['is_active', 'updated_at'])
@@ -77,12 +152,64 @@ class BaseModel(SafeDeleteModel, PolymorphicModel):
 
     @property
     def is_active_real(self):
-        if celery_is_healthy():
+        if celery_is_healthy() or activity_is_fresh():
             return self.is_active
 
         if not self.active_start and not self.active_end:
             return self.is_active
 
+        profiling.record("time_predicate_fallbacks")
         now = timezone.now()
         active_start = self.active_start or now
         return (active_start <= now) and (self.active_end >= now if self.active_end else True)
+
+
+def add_keyset_index(sender, **kwargs):
+    """
+    Добавляет конкретной модели BaseModel индекс (updated_at, pk) для сортировки по умолчанию,
+    KeysetPaginator и ленты изменений changes_since(). Multi-table наследникам индекс не нужен:
+    updated_at хранится в таблице родителя.
+    """
+    opts = sender._meta
+    if not issubclass(sender, BaseModel) or opts.abstract or opts.proxy:
+        return
+    if opts.get_field("updated_at").model is not sender:
+        return
+
+    fields = ["updated_at", opts.pk.attname]
+    if any(list(index.fields) == fields for index in opts.indexes):
+        return
+
+    index = models.Index(fields=fields)
+    index.set_name_with_model(sender)
+    opts.indexes.append(index)
+
+
+class_prepared.connect(add_keyset_index)
+
+
+class ActivityTransition(models.Model):
+    """
+    Запись outbox о смене активности объекта BaseModel: (модель, pk, новое состояние, время).
+    Пишется в той же транзакции, что и изменение is_active (см. django_basemodels.outbox).
+    """
+    id = models.BigAutoField(primary_key=True)
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name="+",
+        verbose_name=_lazy("Тип объекта")
+    )
+    object_pk = models.CharField(max_length=64, verbose_name=_lazy("Первичный ключ объекта"))
+    is_active = models.BooleanField(verbose_name=_lazy("Активность"))
+    at = models.DateTimeField(verbose_name=_lazy("Время изменения"))
+
+    class Meta:
+        verbose_name = _lazy("Смена активности")
+        verbose_name_plural = _lazy("Смены активности")
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_pk} -> {self.is_active}"
+
+    @property
+    def model(self):
+        """Класс модели объекта, через кэш ContentType без отдельного запроса."""
+        return ContentType.objects.db_manager(self._state.db).get_for_id(self.content_type_id).model_class()
@@ -0,0 +1,69 @@
+"""
+Transactional outbox смен активности объектов BaseModel.
+
+При BASEMODELS_ACTIVITY_OUTBOX = True каждая смена is_active — update_activity_status(),
+activate()/deactivate() queryset и экземпляра — добавляет компактные записи ActivityTransition
+(модель, pk, новое состояние, время) в той же транзакции, что и само изменение. Потребители
+(инвалидация кэшей, поисковые индексы) забирают их пачками через drain_transitions() вместо опроса таблиц.
+
+    def reindex(transitions):
+        for transition in transitions:
+            search.update(transition.model, transition.object_pk, transition.is_active)
+
+    drain_transitions(reindex, batch_size=500)
+"""
+
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def outbox_enabled() -> bool:
+    return getattr(settings, "BASEMODELS_ACTIVITY_OUTBOX", False)
+
+
+def record_transitions(model, pks, is_active: bool, at, using: str = DEFAULT_DB_ALIAS):
+    """Добавляет в outbox записи о переходе объектов model с указанными pk в состояние is_active."""
+    if not outbox_enabled() or not pks:
+        return
+
+    from .models import ActivityTransition
+
+    content_type = ContentType.objects.db_manager(using).get_for_model(model)
+    ActivityTransition.objects.using(using).bulk_create([
+        ActivityTransition(content_type=content_type, object_pk=str(pk), is_active=is_active, at=at)
+        for pk in pks
+    ])
+
+
+def drain_transitions(handler, batch_size: int = 500, using: str = DEFAULT_DB_ALIAS, limit: int = None) -> int:
+    """
+    Передаёт записи outbox в handler пачками до batch_size в порядке появления и удаляет обработанные.
+    Каждая пачка обрабатывается в своей транзакции: если handler бросает исключение, пачка остаётся
+    в outbox. Параллельные потребители на PostgreSQL не блокируют друг друга (SKIP LOCKED).
+    Возвращает число обработанных записей; limit ограничивает их общее число за вызов.
+    """
+    from .models import ActivityTransition
+
+    processed = 0
+    while limit is None or processed < limit:
+        size = batch_size if limit is None else min(batch_size, limit - processed)
+        with transaction.atomic(using=using):
+            batch = list(
+                ActivityTransition.objects.using(using)
+                .select_for_update(skip_locked=True)
+                .order_by("id")[:size]
+            )
+            if not batch:
+                break
+
+            handler(batch)
+            ActivityTransition.objects.using(using).filter(id__in=[t.id for t in batch]).delete()
+        processed += len(batch)
+
+    logger.debug(f"Drained {processed} activity transitions")
+    return processed
@@ -0,0 +1,52 @@
+import typing as tp
+
+from django.db import models
+
+from .utils import decode_cursor, encode_cursor
+
+
+class KeysetPage(tp.NamedTuple):
+    """Страница KeysetPaginator и курсор для запроса следующей страницы."""
+    object_list: tp.List[models.Model]
+    next_cursor: tp.Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Keyset-пагинация BaseModel-выборок по (-updated_at, -pk) вместо OFFSET.
+    Стоимость любой страницы одинакова: запрос читает индекс (updated_at, pk) с позиции курсора.
+
+    Принимает любой queryset модели, в том числе active()/inactive() и менеджеры
+    all_objects/deleted_objects — фильтры и видимость soft-delete сохраняются.
+
+        paginator = KeysetPaginator(Article.objects.active(), per_page=50)
+        page = paginator.page(request.GET.get("cursor"))
+    """
+
+    def __init__(self, queryset, per_page: int):
+        if per_page <= 0:
+            raise ValueError("per_page must be a positive integer.")
+
+        self.queryset = queryset.order_by("-updated_at", "-pk")
+        self.per_page = per_page
+
+    def page(self, cursor: tp.Optional[str] = None) -> KeysetPage:
+        """Возвращает страницу после cursor; без курсора — первую страницу."""
+        queryset = self.queryset
+        if cursor:
+            updated_at, pk = decode_cursor(cursor, queryset.model)
+            queryset = queryset.filter(
+                models.Q(updated_at__lt=updated_at) | models.Q(updated_at=updated_at, pk__lt=pk),
+                updated_at__lte=updated_at,
+            )
+
+        objs = list(queryset[:self.per_page + 1])
+        if len(objs) <= self.per_page:
+            return KeysetPage(objs, None)
+
+        objs = objs[:self.per_page]
+        return KeysetPage(objs, encode_cursor(objs[-1].updated_at, objs[-1].pk))
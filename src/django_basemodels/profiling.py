@@ -0,0 +1,136 @@
+"""
+Профилирование горячих путей BaseModel для разработки и CI.
+
+QueryProfile считает внутри блока:
+  - queries — все SQL-запросы;
+  - basemodel_queries — запросы BaseModelQuerySet: вычисление, iterator(), count(), exists(), aggregate(), update() и т. п.;
+  - polymorphic_queries — запросы полиморфного апкаста дочерних классов;
+  - health_checks — вызовы celery_is_healthy();
+  - time_predicate_fallbacks — переходы active()/inactive()/is_active_real на условие по временным полям.
+
+Если задан бюджет и он превышен, QueryProfile бросает QueryBudgetExceeded (mode="raise")
+или пишет предупреждение (mode="warn"). Вне QueryProfile счётчики ничего не делают.
+
+    with QueryProfile(budget={"polymorphic_queries": 2, "health_checks": 1}):
+        render_article_list()
+"""
+
+import contextvars
+import logging
+import warnings
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ("queries", "basemodel_queries", "polymorphic_queries", "health_checks", "time_predicate_fallbacks")
+
+_current_profile = contextvars.ContextVar("django_basemodels_profile", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    """Счётчики QueryProfile превысили заданный бюджет."""
+
+
+def record(counter: str):
+    """Увеличивает счётчик текущего QueryProfile, если профилирование включено."""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.counters[counter] += 1
+
+
+@contextmanager
+def scope(name: str):
+    """Относит SQL-запросы внутри блока к счётчику f"{name}_queries" текущего QueryProfile."""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    profile.scopes[name] += 1
+    try:
+        yield
+    finally:
+        profile.scopes[name] -= 1
+
+
+class QueryProfile:
+    def __init__(self, budget=None, mode: str = "raise", label: str = ""):
+        if mode not in ("raise", "warn"):
+            raise ValueError(f"Unknown mode: {mode!r}")
+        unknown = set(budget or ()) - set(COUNTERS)
+        if unknown:
+            raise ValueError(f"Unknown budget counters: {sorted(unknown)}")
+
+        self.budget = dict(budget or {})
+        self.mode = mode
+        self.label = label
+        self.counters = Counter({counter: 0 for counter in COUNTERS})
+        self.scopes = Counter()
+        self._stack = None
+        self._token = None
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counters["queries"] += 1
+        for name, depth in self.scopes.items():
+            if depth:
+                self.counters[f"{name}_queries"] += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._token = _current_profile.set(self)
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._stack.close()
+        _current_profile.reset(self._token)
+        if exc_type is None:
+            self.check()
+        return False
+
+    def exceeded(self):
+        """Возвращает {счётчик: (значение, бюджет)} для превышенных счётчиков."""
+        return {
+            counter: (self.counters[counter], limit)
+            for counter, limit in self.budget.items()
+            if self.counters[counter] > limit
+        }
+
+    def check(self):
+        exceeded = self.exceeded()
+        if not exceeded:
+            return
+
+        details = ", ".join(f"{counter}={value} (budget {limit})" for counter, (value, limit) in exceeded.items())
+        message = f"BaseModel query budget exceeded{f' in {self.label}' if self.label else ''}: {details}"
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+        warnings.warn(message, RuntimeWarning, stacklevel=3)
+
+
+class QueryProfilerMiddleware:
+    """
+    Профилирует каждый запрос. Бюджет задаётся BASEMODELS_QUERY_BUDGET (словарь счётчик -> максимум),
+    режим — BASEMODELS_QUERY_BUDGET_MODE ("warn" по умолчанию или "raise").
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        profile = QueryProfile(
+            budget=getattr(settings, "BASEMODELS_QUERY_BUDGET", None),
+            mode=getattr(settings, "BASEMODELS_QUERY_BUDGET_MODE", "warn"),
+            label=f"{request.method} {request.path}",
+        )
+        with profile:
+            response = self.get_response(request)
+        request.basemodels_profile = profile
+        return response
@@ -0,0 +1,27 @@
+"""
+pytest-плагин с фикстурой профилирования BaseModel.
+Подключение в conftest.py:
+
+    pytest_plugins = ["django_basemodels.pytest_plugin"]
+"""
+
+import pytest
+
+from .profiling import QueryProfile
+
+
+@pytest.fixture
+def basemodels_profiler():
+    """
+    Фабрика QueryProfile с бюджетом. При превышении бюджета тест падает с QueryBudgetExceeded:
+
+        def test_article_list(client, basemodels_profiler):
+            with basemodels_profiler(polymorphic_queries=1, health_checks=1) as profile:
+                client.get("/articles/")
+            assert profile.counters["time_predicate_fallbacks"] == 0
+    """
+
+    def factory(mode="raise", **budget):
+        return QueryProfile(budget=budget, mode=mode)
+
+    return factory
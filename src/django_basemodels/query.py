@@ -1,15 +1,101 @@
+import functools
 import typing as tp
+from collections import defaultdict
 
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ValidationError
+from django.db import connections, models, transaction
+from django.db.models.constants import LOOKUP_SEP
 from django.utils import timezone
+from django.utils.translation import gettext_lazy as _lazy
 from polymorphic.query import PolymorphicModelIterable, PolymorphicQuerySet
+from safedelete.config import DELETED_VISIBLE
+from safedelete.config import FIELD_NAME as SAFEDELETE_FIELD_NAME
 from safedelete.query import SafeDeleteQuery
 from safedelete.queryset import SafeDeleteQueryset
 
-from .utils import celery_is_healthy
+from . import counters, outbox, profiling
+from .contenttypes import model_for_ctype, pin_ctypes
+from .refresher import activity_is_fresh
+from .utils import celery_is_healthy, decode_cursor, encode_cursor
+
+
+def _get_related_model(model, name: str):
+    """
+    Модель на другом конце связи name модели model. name — имя поля или accessor обратной связи,
+    как в prefetch_related(). Для GenericForeignKey возвращает None.
+    """
+    for field in model._meta.get_fields():
+        if not field.is_relation:
+            continue
+        accessor = field.get_accessor_name() if field.auto_created and not field.concrete else field.name
+        if accessor == name:
+            return field.related_model
+    raise ValueError(f"{model._meta.label} has no relation {name!r}")
+
+
+def _profiled(method):
+    """Относит SQL-запросы метода queryset к счётчику basemodel_queries текущего QueryProfile."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with profiling.scope("basemodel"):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _profiled_iter(iterator):
+    """Как _profiled для генератора: в scope выполняется только получение очередного объекта."""
+    while True:
+        with profiling.scope("basemodel"):
+            try:
+                obj = next(iterator)
+            except StopIteration:
+                return
+        yield obj
+
+
+class Change(tp.NamedTuple):
+    """
+    Элемент ленты изменений: вид изменения и сам объект.
+    Вид описывает состояние объекта на момент чтения, а не конкретный переход: inactive означает,
+    что изменённый объект сейчас неактивен, независимо от того, менялся ли is_active.
+    """
+    CREATED = "created"
+    UPDATED = "updated"
+    INACTIVE = "inactive"
+    DELETED = "deleted"
+
+    kind: str
+    obj: models.Model
+
+
+class ChangesPage(tp.NamedTuple):
+    """Страница ленты изменений и курсор для запроса следующей страницы."""
+    changes: tp.List[Change]
+    cursor: tp.Optional[str]
+    has_more: bool
+
+
+def validate_activity_ranges(objs):
+    """
+    Проверяет правило BaseModel.clean (active_start <= active_end) сразу для всей пачки объектов.
+    """
+    invalid = [
+        obj for obj in objs
+        if obj.active_start and obj.active_end and obj.active_end < obj.active_start
+    ]
+    if invalid:
+        raise ValidationError(
+            _lazy("Конец активности не может быть раньше начала (объектов с ошибкой: %(count)s)"),
+            params={"count": len(invalid)},
+        )
 
 
 class BaseModelQuerySet(SafeDeleteQueryset, PolymorphicQuerySet):
+    # Размер пачки activate()/deactivate()/soft_delete() при включённых счётчиках или outbox
+    state_change_batch_size = 1000
+
     def __init__(self,
                  model: tp.Optional[tp.Type[models.Model]] = None,
                  query: tp.Optional[SafeDeleteQuery] = None,
@@ -35,28 +121,315 @@ class BaseModelQuerySet(SafeDeleteQueryset, PolymorphicQuerySet):
 
     as_manager.queryset_only = True
 
+    def _filter_or_exclude(self, negate, args, kwargs):
+        if "instance_of" in kwargs or "not_instance_of" in kwargs:
+            # instance_of подставляет id ContentType из кэша, иначе строит подзапрос к ContentType
+            pin_ctypes(self.db)
+        return super()._filter_or_exclude(negate, args, kwargs)
+
+    # Запросы queryset считаются в profiling как basemodel_queries: вычисление (_fetch_all),
+    # iterator() и методы, которые выполняют SQL сами, минуя _fetch_all
+    @_profiled
+    def _fetch_all(self):
+        super()._fetch_all()
+
+    def iterator(self, chunk_size=None):
+        return _profiled_iter(super().iterator(chunk_size))
+
+    @_profiled
+    def count(self):
+        return super().count()
+
+    @_profiled
+    def exists(self):
+        return super().exists()
+
+    @_profiled
+    def aggregate(self, *args, **kwargs):
+        return super().aggregate(*args, **kwargs)
+
+    @_profiled
+    def explain(self, *, format=None, **options):
+        return super().explain(format=format, **options)
+
+    @_profiled
+    def _update(self, values):
+        return super()._update(values)
+
+    _update.queryset_only = False
+
+    @_profiled
+    def _raw_delete(self, using):
+        return super()._raw_delete(using)
+
+    _raw_delete.alters_data = True
+
+    def _get_real_instances(self, base_result_objects):
+        # Полиморфный апкаст определяет классы по кэшу ContentType — возвращаем в него закреплённые записи
+        pin_ctypes(self.db)
+        with profiling.scope("polymorphic"):
+            return super()._get_real_instances(base_result_objects)
+
+    def unordered(self):
+        """
+        Сбрасывает сортировку, включая Meta.ordering = ['-updated_at', '-pk'].
+        Для внутренних массовых операций, которым порядок строк не важен.
+        """
+        return self.order_by()
+
+    @_profiled
     def update(self, **kwargs):
         """
-        При любом обновлении автоматически ставим updated_at = timezone.now().
+        При любом обновлении автоматически ставим updated_at = timezone.now(), если значение не передано явно.
         """
-        kwargs['updated_at'] = timezone.now()
+        kwargs.setdefault('updated_at', timezone.now())
         return super().update(**kwargs)
 
     def activate(self):
         """
-        Массово установить is_active=True → обновится updated_at.
+        Массово установить is_active=True неактивным объектам → у них обновится updated_at.
         """
-        return super().update(is_active=True)
+        return self._set_is_active(True)
 
     def deactivate(self):
         """
-        Массово установить is_active=False → обновится updated_at.
+        Массово установить is_active=False активным объектам → у них обновится updated_at.
+        """
+        return self._set_is_active(False)
+
+    def _set_is_active(self, is_active):
+        """
+        Выставляет is_active объектам, у которых он отличается, и возвращает их число. Если включены
+        счётчики или outbox, строки обновляются пачками (см. _update_in_batches): переходы и счётчики
+        считаются по строкам, заблокированным в транзакции пачки, с тем же временем, что и updated_at.
+        """
+        queryset = self.filter(is_active=not is_active)
+        if not (counters.counters_enabled() or outbox.outbox_enabled()):
+            return queryset.update(is_active=is_active)
+        return self._transition_in_batches(queryset, is_active, timezone.now())
+
+    def soft_delete(self):
+        """
+        Массовое мягкое удаление одним UPDATE, без загрузки объектов → обновится updated_at.
+        Со счётчиками строки удаляются пачками, чтобы вычесть из счётчиков именно удалённые строки.
+        """
+        now = timezone.now()
+        if not counters.counters_enabled():
+            return self.update(**{SAFEDELETE_FIELD_NAME: now})
+
+        def on_batch(rows):
+            counters.adjust_for_rows(
+                self.model, self.db,
+                [(ctype_id, was_active) for _pk, ctype_id, deleted, was_active in rows if deleted is None],
+                removed=True,
+            )
+
+        return self._update_in_batches(self, {SAFEDELETE_FIELD_NAME: now, "updated_at": now}, on_batch)
+
+    def _update_in_batches(self, queryset, values, on_batch, batch_size=None):
+        """
+        Обновляет строки queryset значениями values пачками по batch_size (по умолчанию
+        state_change_batch_size) в порядке pk. Каждая пачка блокируется SELECT ... FOR UPDATE и вместе
+        с on_batch(rows) выполняется в своей транзакции; rows — кортежи
+        (pk, polymorphic_ctype_id, значение поля удаления, is_active) до обновления.
+        UPDATE идёт в обход safedelete по pk заблокированных строк. Возвращает число обновлённых строк.
+        """
+        batch_size = batch_size or self.state_change_batch_size
+        queryset = queryset.order_by("pk")
+        total = 0
+        last_pk = None
+        while True:
+            with transaction.atomic(using=self.db):
+                batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                rows = list(
+                    batch.select_for_update()
+                    .values_list("pk", "polymorphic_ctype_id", SAFEDELETE_FIELD_NAME, "is_active")[:batch_size]
+                )
+                if not rows:
+                    return total
+
+                models.QuerySet.update(queryset.filter(pk__in=[row[0] for row in rows]), **values)
+                on_batch(rows)
+            total += len(rows)
+            last_pk = rows[-1][0]
+
+    @_profiled
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                    update_fields=None, unique_fields=None):
+        """
+        Массовая вставка объектов без поштучного save().
+        polymorphic_ctype проставляется один раз на класс в пачке, интервалы активности проверяются
+        для всей пачки сразу. Для multi-table наследников строки вставляются пачками в каждую таблицу
+        иерархии от корня к потомку, pk корня возвращаются через RETURNING (PostgreSQL, SQLite 3.35+).
+        Пачка может смешивать модель queryset и её наследников: каждая таблица получает строки всех
+        объектов, в иерархию которых она входит.
+        """
+        objs = list(objs)
+        if not objs:
+            return objs
+
+        concrete_model = self.model._meta.concrete_model
+        groups = {}
+        for obj in objs:
+            model = type(obj)._meta.concrete_model
+            if not issubclass(model, concrete_model):
+                raise ValueError(f"Can't bulk create a {type(obj).__name__} instance with {self.model.__name__} queryset")
+            groups.setdefault(model, []).append(obj)
+
+        validate_activity_ranges(objs)
+        self._set_polymorphic_ctypes(objs)
+
+        if list(groups) == [concrete_model] and not concrete_model._meta.parents:
+            # Обходим PolymorphicQuerySet.bulk_create: ctype уже проставлен,
+            # а он не передаёт дальше update_conflicts/update_fields/unique_fields
+            objs = models.QuerySet.bulk_create(
+                self, objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts,
+                update_conflicts=update_conflicts, update_fields=update_fields, unique_fields=unique_fields,
+            )
+            if not (ignore_conflicts or update_conflicts):
+                self._adjust_counters_for_created(groups)
+            return objs
+
+        if ignore_conflicts or update_conflicts:
+            raise ValueError("Conflict handling is not supported for multi-table bulk_create")
+        if batch_size is not None and batch_size <= 0:
+            raise ValueError("Batch size must be a positive integer.")
+
+        # Таблицы в порядке от корня к потомкам (родители каждой таблицы встречаются раньше неё),
+        # строки в каждой таблице — в порядке objs
+        chains = {model: [*reversed(model._meta.get_parent_list()), model] for model in groups}
+        tables = {}
+        for obj in objs:
+            for table in chains[type(obj)._meta.concrete_model]:
+                tables.setdefault(table, []).append(obj)
+
+        self._for_write = True
+        with transaction.atomic(using=self.db, savepoint=False):
+            for table, table_objs in tables.items():
+                self._insert_table(table, table_objs, batch_size)
+
+        for obj in objs:
+            obj._state.adding = False
+            obj._state.db = self.db
+        self._adjust_counters_for_created(groups)
+        return objs
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        """
+        Массовое обновление полей объектов. Интервалы активности проверяются для всей пачки сразу,
+        updated_at выставляется один раз на вызов и записывается во все пачки вместе с fields,
+        поэтому значение в объектах совпадает с сохранённым в БД.
         """
-        return super().update(is_active=False)
+        objs = list(objs)
+        if {"active_start", "active_end"} & set(fields):
+            validate_activity_ranges(objs)
 
-    def _active_q(self):
-        """Условие для определения реальной активности элемента (по времени)."""
         now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        if "updated_at" not in fields:
+            fields = [*fields, "updated_at"]
+
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+    bulk_update.alters_data = True
+
+    def _adjust_counters_for_created(self, groups):
+        for model, objs in groups.items():
+            for obj in objs:
+                # Дальнейшие save()/delete() корректируют счётчики от вставленного состояния
+                obj._counted_is_active = obj._counted_state()
+            active = sum(1 for obj in objs if obj.is_active)
+            counters.adjust(model, self.db, active=active, inactive=len(objs) - active)
+
+    def _set_polymorphic_ctypes(self, objs):
+        """Проставляет polymorphic_ctype объектам без него, один запрос к кэшу ContentType на класс."""
+        content_type_manager = ContentType.objects.db_manager(self.db)
+        ctype_ids = {}
+        for obj in objs:
+            if obj.polymorphic_ctype_id:
+                continue
+            model = type(obj)
+            if model not in ctype_ids:
+                ctype_ids[model] = content_type_manager.get_for_model(model, for_concrete_model=False).pk
+            obj.polymorphic_ctype_id = ctype_ids[model]
+
+    def _insert_table(self, model, objs, batch_size):
+        """Пачками вставляет в таблицу model её локальные поля objs и связывает их pk с родителями."""
+        opts = model._meta
+        for parent, link in opts.parents.items():
+            if link:
+                for obj in objs:
+                    setattr(obj, link.attname, getattr(obj, parent._meta.pk.attname))
+
+        fields = [f for f in opts.local_concrete_fields if not f.generated]
+        queryset = models.QuerySet(model=model, using=self.db)
+        if opts.parents:
+            queryset._batched_insert(objs, fields, batch_size)
+            return
+
+        objs_with_pk = [obj for obj in objs if obj._is_pk_set()]
+        objs_without_pk = [obj for obj in objs if not obj._is_pk_set()]
+        if objs_with_pk:
+            queryset._batched_insert(objs_with_pk, fields, batch_size)
+        if not objs_without_pk:
+            return
+
+        # Корень иерархии с автоинкрементным pk: pk нужны для связи с дочерними таблицами
+        fields = [f for f in fields if not isinstance(f, models.AutoField)]
+        if connections[self.db].features.can_return_rows_from_bulk_insert:
+            returned_columns = queryset._batched_insert(objs_without_pk, fields, batch_size)
+        else:
+            returned_columns = [
+                queryset._insert([obj], fields=fields, using=self.db, returning_fields=opts.db_returning_fields)[0]
+                for obj in objs_without_pk
+            ]
+        for obj, results in zip(objs_without_pk, returned_columns):
+            for result, field in zip(results, opts.db_returning_fields):
+                setattr(obj, field.attname, result)
+
+    def changes_since(self, cursor: tp.Optional[str] = None, limit: int = 1000) -> ChangesPage:
+        """
+        Возвращает следующую страницу ленты изменений после cursor, упорядоченную по (updated_at, pk).
+        В ленту попадают в том числе мягко удалённые объекты. Вид изменения определяется по состоянию
+        объекта: deleted — мягко удалён, created — создан после позиции курсора, inactive — изменён и сейчас
+        неактивен (это не обязательно деактивация), иначе updated. Для следующей страницы передайте полученный ChangesPage.cursor.
+        """
+        queryset = self._chain().all(force_visibility=DELETED_VISIBLE).order_by("updated_at", "pk")
+
+        since = None
+        if cursor:
+            since, pk = decode_cursor(cursor, self.model)
+            queryset = queryset.filter(
+                models.Q(updated_at__gt=since) | models.Q(updated_at=since, pk__gt=pk),
+                updated_at__gte=since,
+            )
+
+        objs = list(queryset[:limit + 1])
+        has_more = len(objs) > limit
+        objs = objs[:limit]
+
+        changes = []
+        for obj in objs:
+            if getattr(obj, SAFEDELETE_FIELD_NAME):
+                kind = Change.DELETED
+            elif since is None or obj.created_at > since:
+                kind = Change.CREATED
+            elif not obj.is_active:
+                kind = Change.INACTIVE
+            else:
+                kind = Change.UPDATED
+            changes.append(Change(kind, obj))
+
+        if objs:
+            cursor = encode_cursor(objs[-1].updated_at, objs[-1].pk)
+        return ChangesPage(changes, cursor, has_more)
+
+    def _active_q(self, now=None):
+        """Условие для определения реальной активности элемента (по времени) на момент now."""
+        now = now or timezone.now()
         always = models.Q(is_active=True, active_start__isnull=True, active_end__isnull=True)
 
         timed_both = models.Q(
@@ -78,56 +451,128 @@ class BaseModelQuerySet(SafeDeleteQueryset, PolymorphicQuerySet):
 
         return always | timed_both | timed_start_only | timed_end_only
 
-    def active(self):
+    def active(self, now=None):
         """
         Возвращает только активные элементы
-        Если celery доступен, то возвращает элементы с фильтрацией по полю is_active=True.
-        Если celery недоступен, возвращает элементы с фильтрацией по условию определения реальной активности.
+        Если celery доступен или is_active недавно пересчитан резервным обновлятелем (см. refresher),
+        то возвращает элементы с фильтрацией по полю is_active=True.
+        Иначе возвращает элементы с фильтрацией по условию определения реальной активности
+        на момент now (по умолчанию — текущий).
         """
-        if celery_is_healthy():
+        if celery_is_healthy() or activity_is_fresh():
             return self.filter(is_active=True)
-        return self.filter(self._active_q())
 
-    def inactive(self):
+        profiling.record("time_predicate_fallbacks")
+        return self.filter(self._active_q(now))
+
+    def inactive(self, now=None):
         """
         Возвращает только неактивные элементы
-        Если celery доступен, то возвращает элементы с фильтрацией по полю is_active=False.
-        Если celery недоступен, возвращает элементы с фильтрацией по условию определения реальной активности.
+        Если celery доступен или is_active недавно пересчитан резервным обновлятелем (см. refresher),
+        то возвращает элементы с фильтрацией по полю is_active=False.
+        Иначе возвращает элементы с фильтрацией по условию определения реальной активности
+        на момент now (по умолчанию — текущий).
         """
-        if celery_is_healthy():
+        if celery_is_healthy() or activity_is_fresh():
             return self.filter(is_active=False)
 
-        return self.filter(~self._active_q())
+        profiling.record("time_predicate_fallbacks")
+        return self.filter(~self._active_q(now))
+
+    def prefetch_active(self, *relations, now=None):
+        """
+        prefetch_related() для связей relations ("children", "children__tags"), который подгружает
+        только активные и не удалённые связанные объекты BaseModel.
+        Для каждого уровня каждой связи строится Prefetch с queryset менеджера objects связанной модели:
+          - условие активности выбирается один раз и для условия по времени закреплено на момент now;
+          - каждый уровень загружается одним запросом, полиморфный апкаст — одним запросом на подкласс;
+          - связанные модели не из BaseModel загружаются без фильтрации.
+        """
+        from .models import BaseModel
+
+        now = now or timezone.now()
+        if celery_is_healthy() or activity_is_fresh():
+            condition = models.Q(is_active=True)
+        else:
+            profiling.record("time_predicate_fallbacks")
+            condition = self._active_q(now)
+
+        lookups = {}
+        for relation in relations:
+            model = self.model
+            path = []
+            for name in relation.split(LOOKUP_SEP):
+                path.append(name)
+                lookup = LOOKUP_SEP.join(path)
+                if model is None:
+                    # За GenericForeignKey модель неизвестна, дальше связи передаются как есть
+                    lookups.setdefault(lookup, lookup)
+                    continue
 
+                model = _get_related_model(model, name)
+                if model is not None and issubclass(model, BaseModel):
+                    lookups.setdefault(lookup, models.Prefetch(lookup, queryset=model.objects.filter(condition)))
+                else:
+                    lookups.setdefault(lookup, lookup)
+
+        return self.prefetch_related(*lookups.values())
+
+    @_profiled
     def update_activity_status(self, batch_size=1000):
         """
         Обновляет is_active для всех объектов в queryset по правилам:
           - Если задан active_start: active_start <= now
           - Если задан active_end: active_end >= now
           - Если оба не заданы: сохраняем текущее is_active
+        Изменяются только объекты, у которых статус действительно меняется; у них же обновляется
+        updated_at, чтобы переход попал в ленту изменений changes_since().
+        При включённом outbox или счётчиках объекты обновляются пачками по batch_size, и каждая пачка
+        вместе с записями о переходах и корректировкой счётчиков фиксируется в одной транзакции.
+        Возвращает число изменённых объектов.
         """
         now = timezone.now()
 
-        is_active_condition = models.Case(
-            models.When(
-                models.Q(active_start__isnull=False, active_end__isnull=False),
-                then=models.Q(active_start__lte=now, active_end__gte=now)
-            ),
-            models.When(
-                models.Q(active_start__isnull=False, active_end__isnull=True),
-                then=models.Q(active_start__lte=now)
-            ),
-            models.When(
-                models.Q(active_start__isnull=True, active_end__isnull=False),
-                then=models.Q(active_end__gte=now)
-            ),
-            models.When(
-                models.Q(active_start__isnull=True, active_end__isnull=True),
-                then=models.F('is_active')
-            ),
-            default=models.Value(True),
-            output_field=models.BooleanField()
+        timed_active = models.Q(
+            models.Q(active_start__isnull=False, active_end__isnull=False,
+                     active_start__lte=now, active_end__gte=now)
+            | models.Q(active_start__isnull=False, active_end__isnull=True, active_start__lte=now)
+            | models.Q(active_start__isnull=True, active_end__isnull=False, active_end__gte=now)
         )
+        timed_inactive = models.Q(active_start__gt=now) | models.Q(active_end__lt=now)
+
+        # Обходим BaseModelQuerySet.update() и safedelete: активность пересчитывается для всех строк,
+        # включая мягко удалённые, а updated_at выставляется явно. Та же видимость нужна и выборкам
+        # пачек outbox, иначе с outbox мягко удалённые строки перестали бы обновляться
+        queryset = self.unordered().all(force_visibility=DELETED_VISIBLE)
+        to_activate = queryset.filter(timed_active, is_active=False)
+        to_deactivate = queryset.filter(timed_inactive, is_active=True)
+        if outbox.outbox_enabled() or counters.counters_enabled():
+            activated = self._transition_in_batches(to_activate, True, now, batch_size)
+            deactivated = self._transition_in_batches(to_deactivate, False, now, batch_size)
+            return activated + deactivated
+
+        activated = models.QuerySet.update(to_activate, is_active=True, updated_at=now)
+        deactivated = models.QuerySet.update(to_deactivate, is_active=False, updated_at=now)
+        return activated + deactivated
+
+    def _transition_in_batches(self, queryset, is_active, now, batch_size=None):
+        """Переводит строки queryset в is_active пачками, записывая переходы в outbox и корректируя счётчики."""
+
+        def on_batch(rows):
+            self._record_transitions([(pk, ctype_id) for pk, ctype_id, _deleted, _active in rows], is_active, now)
+            counters.adjust_for_rows(
+                self.model, self.db,
+                [(ctype_id, was_active) for _pk, ctype_id, deleted, was_active in rows if deleted is None],
+                is_active=is_active,
+            )
+
+        return self._update_in_batches(queryset, {"is_active": is_active, "updated_at": now}, on_batch, batch_size)
+
+    def _record_transitions(self, changed, is_active, now):
+        """Записывает в outbox переходы строк (pk, polymorphic_ctype_id) с реальной моделью каждой строки."""
+        pks_by_ctype = defaultdict(list)
+        for pk, ctype_id in changed:
+            pks_by_ctype[ctype_id].append(pk)
 
-        # Обходим BaseModelQuerySet.update(), чтобы не обновлять updated_at
-        return models.QuerySet.update(self, is_active=is_active_condition)
+        for ctype_id, pks in pks_by_ctype.items():
+            outbox.record_transitions(model_for_ctype(ctype_id, self.db, self.model), pks, is_active, now, self.db)
@@ -0,0 +1,161 @@
+"""
+Резервное обновление активности внутри процесса на время недоступности Celery.
+
+Пока celery_is_healthy() возвращает False, active()/inactive() переходят с дешёвого фильтра
+по индексу is_active на дорогое условие по временным полям. ActivityRefresher в фоновом потоке
+вызывает update_activity_status() для всех моделей, пока Celery недоступен, и отмечает время
+последнего обновления в кэше Django. Пока эта отметка свежая, запросы продолжают использовать is_active.
+
+Из всех процессов обновление выполняет один лидер: блокировка берётся через cache.add(), поэтому
+для нескольких процессов нужен общий кэш (Redis, Memcached, база данных).
+"""
+
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+from .activity import refresh_activity
+from .utils import celery_is_healthy
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "django_basemodels:activity_refresher:leader"
+REFRESHED_AT_KEY = "django_basemodels:activity_refresher:refreshed_at"
+
+# Как часто процесс перечитывает отметку свежести из кэша, секунд
+FRESHNESS_CHECK_INTERVAL = 1.0
+
+_fresh = False
+_fresh_checked_at = 0.0
+_refresher = None
+
+
+def _get_cache():
+    return caches[getattr(settings, "BASEMODELS_ACTIVITY_REFRESHER_CACHE", "default")]
+
+
+def activity_is_fresh() -> bool:
+    """
+    Возвращает True, если резервный обновлятель недавно пересчитал is_active,
+    и запросам можно полагаться на флаг даже при недоступном Celery.
+    """
+    global _fresh, _fresh_checked_at
+
+    if not getattr(settings, "BASEMODELS_ACTIVITY_REFRESHER", False):
+        return False
+
+    now = time.monotonic()
+    if now - _fresh_checked_at >= FRESHNESS_CHECK_INTERVAL:
+        try:
+            _fresh = _get_cache().get(REFRESHED_AT_KEY) is not None
+        except Exception as exc:
+            logger.error("Error checking activity refresher state", exc_info=exc)
+            _fresh = False
+        _fresh_checked_at = now
+    return _fresh
+
+
+class ActivityRefresher:
+    """
+    Фоновый поток, который раз в interval секунд обновляет is_active всех моделей с активностью
+    во всех базах и схемах (см. activity.get_activity_targets), если Celery недоступен и этот процесс — лидер.
+    Отметка свежести живёт 2 * interval секунд: если лидер пропал, запросы вернутся к временным полям.
+    """
+
+    def __init__(self, interval: float = 60):
+        self.interval = interval
+        self.token = uuid.uuid4().hex
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def ttl(self) -> int:
+        return max(int(self.interval * 2), 1)
+
+    def is_leader(self) -> bool:
+        """Берёт или продлевает блокировку лидера."""
+        cache = _get_cache()
+        if cache.add(LEADER_KEY, self.token, self.ttl):
+            return True
+        if cache.get(LEADER_KEY) == self.token:
+            cache.touch(LEADER_KEY, self.ttl)
+            return True
+        return False
+
+    def run_once(self):
+        """
+        Один проход: при недоступном Celery лидер обновляет все модели.
+        Отметка свежести ставится, только если все ячейки обновились без ошибок, иначе снимается.
+        Возвращает матрицу результатов activity.refresh_activity() или None, если обновление не требовалось.
+        """
+        if celery_is_healthy() or not self.is_leader():
+            return None
+
+        results = refresh_activity()
+        failed = [
+            f"{target}:{label}"
+            for target, row in results.items()
+            for label, result in row.items()
+            if isinstance(result, dict) and "error" in result
+        ]
+        if failed:
+            # Флаги части ячеек устарели — запросы возвращаются к временным полям сразу, не дожидаясь ttl
+            _get_cache().delete(REFRESHED_AT_KEY)
+            logger.warning(f"Activity refresher failed for {len(failed)} cells: {', '.join(failed)}")
+            return results
+
+        _get_cache().set(REFRESHED_AT_KEY, time.time(), self.ttl)
+        logger.debug(f"Activity refresher updated {len(results)} targets")
+        return results
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                logger.exception("Activity refresher failed: %s", exc)
+            finally:
+                connections.close_all()
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self.run, name="basemodels-activity-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        cache = _get_cache()
+        if cache.get(LEADER_KEY) == self.token:
+            cache.delete(LEADER_KEY)
+
+
+def start_activity_refresher(interval: float = None) -> ActivityRefresher:
+    """Запускает резервный обновлятель активности этого процесса (один на процесс)."""
+    global _refresher
+
+    if _refresher is None:
+        if interval is None:
+            interval = getattr(settings, "BASEMODELS_ACTIVITY_REFRESHER_INTERVAL", 60)
+        _refresher = ActivityRefresher(interval=interval)
+    _refresher.start()
+    return _refresher
+
+
+def stop_activity_refresher():
+    """Останавливает резервный обновлятель активности этого процесса."""
+    global _refresher
+
+    if _refresher is not None:
+        _refresher.stop()
+        _refresher = None
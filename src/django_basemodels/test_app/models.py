@@ -8,3 +8,28 @@ class TestBaseModel(BaseModel):
 
     class Meta:
         app_label = 'django_basemodels_tests'
+
+
+class TestChildModel(TestBaseModel):
+    # multi-table наследник для проверки полиморфных сценариев
+    extra = models.CharField(max_length=255, default='child')
+
+    class Meta:
+        app_label = 'django_basemodels_tests'
+
+
+class TestCodeModel(BaseModel):
+    # модель с первичным ключом не id, наследует индексы и сортировку BaseModel.Meta
+    code = models.CharField(max_length=32, primary_key=True)
+
+    class Meta(BaseModel.Meta):
+        app_label = 'django_basemodels_tests'
+
+
+class TestRelatedModel(BaseModel):
+    # связанная модель для проверки prefetch_active()
+    parent = models.ForeignKey(TestBaseModel, on_delete=models.CASCADE, related_name='related')
+    owner = models.ForeignKey('auth.User', on_delete=models.CASCADE, null=True, blank=True)
+
+    class Meta:
+        app_label = 'django_basemodels_tests'
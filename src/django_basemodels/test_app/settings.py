@@ -6,8 +6,10 @@ SECRET_KEY = "test-secret-key"
 DEBUG = True
 
 INSTALLED_APPS = [
+    "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
+    "django.contrib.messages",
     # внешние зависимости, требуемые пакетом
     "polymorphic",
     "safedelete",
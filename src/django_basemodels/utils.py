@@ -1,6 +1,12 @@
+import base64
+import json
 import logging
 
-from . import CELERY_AVAILABLE
+from django.apps import apps
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+
+from . import CELERY_AVAILABLE, profiling
 
 if CELERY_AVAILABLE:
     import celery_hchecker
@@ -15,6 +21,7 @@ def celery_is_healthy() -> bool:
     Возвращает True, если Celery доступен и воркеры запущены.
     Если Celery не установлен, возвращает False.
     """
+    profiling.record("health_checks")
     try:
         if not CELERY_AVAILABLE:
             return False
@@ -37,3 +44,90 @@ def celery_is_healthy() -> bool:
     except Exception as exc:
         logger.error("Error checking Celery health", exc_info=exc)
         return False
+
+
+def get_models_with_activity():
+    """Генератор моделей, которые наследуются от BaseModel и имеют активность"""
+    from .models import BaseModel
+
+    for model in apps.get_models():
+        if issubclass(model, BaseModel) and not model._meta.abstract and not model._meta.proxy:
+            yield model
+
+
+def iter_pk_chunks(queryset, size: int):
+    """
+    Обходит pk объектов queryset пачками не больше size по возрастанию pk.
+    Каждая пачка читается отдельным keyset-запросом (pk > последнего прочитанного), без OFFSET
+    и без чтения всех pk в память.
+    """
+    pks = queryset.order_by("pk").values_list("pk", flat=True)
+    last_pk = None
+    while True:
+        chunk = list((pks if last_pk is None else pks.filter(pk__gt=last_pk))[:size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+# Массовые операции, которые разрешено запускать по имени (админка, фоновые задачи)
+BULK_ACTIONS = ("activate", "deactivate", "soft_delete")
+
+
+def run_bulk_action(model, action: str, pks) -> int:
+    """
+    Выполняет массовую операцию BaseModelQuerySet над объектами модели с указанными pk.
+    Возвращает число затронутых строк.
+    """
+    if action not in BULK_ACTIONS:
+        raise ValueError(f"Unknown bulk action: {action!r}")
+
+    queryset = model.all_objects.non_polymorphic().filter(pk__in=list(pks))
+    return getattr(queryset, action)()
+
+
+def estimate_count(queryset):
+    """
+    Возвращает оценку числа строк queryset по статистике планировщика БД.
+    Поддерживается только PostgreSQL, для остальных СУБД возвращает None.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    try:
+        sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+    except Exception as exc:
+        logger.error("Error estimating queryset count", exc_info=exc)
+        return None
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def encode_cursor(updated_at, pk) -> str:
+    """Упаковывает позицию (updated_at, pk) в непрозрачную строку-курсор."""
+    payload = json.dumps([updated_at.isoformat(), str(pk)])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, model):
+    """
+    Распаковывает строку-курсор в (updated_at, pk) для модели model.
+    Бросает ValueError, если курсор повреждён.
+    """
+    try:
+        updated_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        updated_at = parse_datetime(updated_at)
+        pk = model._meta.pk.to_python(pk)
+    except Exception as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+
+    if updated_at is None:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return updated_at, pk
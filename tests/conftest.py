@@ -23,3 +23,5 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "tests.test_settings")
 import django
 
 django.setup()
+
+pytest_plugins = ["django_basemodels.pytest_plugin"]
@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+from django.utils import timezone
+from django_basemodels import activity
+from django_basemodels.test_app.models import TestBaseModel
+
+SCHEMAS_SWITCHED = []
+
+
+@contextmanager
+def fake_schema_context(using, schema):
+    if schema == "broken":
+        raise RuntimeError("schema does not exist")
+    SCHEMAS_SWITCHED.append((using, schema))
+    yield
+
+
+def tenant_schemas():
+    return ["tenant_a", "tenant_b"]
+
+
+def test_targets_default_to_default_database():
+    """Тестируем цели обновления по умолчанию"""
+    assert activity.get_activity_targets() == [("default", None)]
+
+
+def test_targets_fan_out_over_databases_and_schemas(settings):
+    """Тестируем декартово произведение баз и схем, в том числе из функции"""
+    settings.BASEMODELS_ACTIVITY_DATABASES = ["default", "replica"]
+    settings.BASEMODELS_ACTIVITY_SCHEMAS = "tests.test_activity.tenant_schemas"
+
+    assert activity.get_activity_targets() == [
+        ("default", "tenant_a"), ("default", "tenant_b"),
+        ("replica", "tenant_a"), ("replica", "tenant_b"),
+    ]
+
+
+@pytest.mark.django_db
+def test_refresh_activity_isolates_failing_tenant(settings):
+    """Тестируем матрицу результатов и изоляцию ошибок отдельной схемы"""
+    settings.BASEMODELS_ACTIVITY_SCHEMA_CONTEXT = "tests.test_activity.fake_schema_context"
+    SCHEMAS_SWITCHED.clear()
+    TestBaseModel.objects.create(is_active=False, active_start=timezone.now() - timezone.timedelta(days=1))
+    label = TestBaseModel._meta.label_lower
+
+    results = activity.refresh_activity(
+        models=[TestBaseModel],
+        targets=[("default", "broken"), ("default", "tenant_a")],
+    )
+
+    assert results["default:broken"][label] == {"error": "schema does not exist"}
+    assert results["default:tenant_a"][label] == 1
+    assert SCHEMAS_SWITCHED == [("default", "tenant_a")]
+
+
+def test_refresh_activity_bounds_concurrency(monkeypatch):
+    """Тестируем что ячейки раскладываются не более чем на concurrency пачек"""
+    calls = []
+    monkeypatch.setattr(activity, "update_model_activity", lambda label, using, schema: calls.append(schema) or 0)
+    monkeypatch.setattr(activity.connections, "close_all", lambda: None)
+    targets = [("default", f"tenant_{i}") for i in range(5)]
+
+    results = activity.refresh_activity(models=[TestBaseModel], targets=targets, concurrency=2)
+
+    assert sorted(calls) == [f"tenant_{i}" for i in range(5)]
+    assert len(results) == 5
+    assert len(activity.split_cells(activity.get_activity_cells([TestBaseModel], targets), 2)) == 2
+
+
+def test_search_path_schema_requires_postgresql():
+    """Тестируем что переключение search_path поддерживается только в PostgreSQL"""
+    with pytest.raises(ValueError):
+        with activity.search_path_schema("default", "tenant_a"):
+            pass
+
+
+class FakePostgresConnection:
+    """Соединение PostgreSQL, у которого после ошибки в теле блока падает любой запрос"""
+    vendor = "postgresql"
+    alias = "tenant_db"
+
+    def __init__(self, in_atomic_block):
+        self.in_atomic_block = in_atomic_block
+        self.aborted = False
+        self.executed = []
+        self.closed = False
+        self.needs_rollback = False
+        self.ops = mock.Mock(quote_name=lambda name: f'"{name}"')
+
+    def cursor(self):
+        connection = self
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchone.return_value = ("public",)
+
+        def execute(sql):
+            if connection.aborted:
+                raise RuntimeError("current transaction is aborted")
+            connection.executed.append(sql)
+
+        cursor.execute.side_effect = execute
+        return cursor
+
+    def set_rollback(self, rollback):
+        self.needs_rollback = rollback
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("in_atomic_block", [True, False])
+def test_search_path_schema_keeps_original_error(monkeypatch, in_atomic_block):
+    """Тестируем что ошибка восстановления search_path не маскирует исходную ошибку"""
+    connection = FakePostgresConnection(in_atomic_block)
+    monkeypatch.setattr(activity, "connections", {"tenant_db": connection})
+
+    with pytest.raises(ValueError, match="original"):
+        with activity.search_path_schema("tenant_db", "tenant_a"):
+            connection.aborted = True
+            raise ValueError("original")
+
+    # Соединение не остаётся на схеме арендатора: транзакция будет откачена или соединение закрыто
+    assert connection.needs_rollback is in_atomic_block
+    assert connection.closed is not in_atomic_block
+
+
+def test_search_path_schema_restores_previous_path(monkeypatch):
+    """Тестируем восстановление search_path после блока"""
+    connection = FakePostgresConnection(in_atomic_block=False)
+    monkeypatch.setattr(activity, "connections", {"tenant_db": connection})
+
+    with activity.search_path_schema("tenant_db", "tenant_a"):
+        pass
+
+    assert connection.executed == ["SHOW search_path", 'SET search_path TO "tenant_a", public', "SET search_path TO public"]
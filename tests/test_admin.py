@@ -0,0 +1,159 @@
+from unittest import mock
+
+import pytest
+from django.contrib.admin import AdminSite
+from django.contrib.auth.models import User
+from django.test import RequestFactory
+from django_basemodels import admin as admin_mod
+from django_basemodels.admin import EstimatedCountPaginator, HighScaleBaseModelAdmin
+from django_basemodels.celery import changelist_action_task
+from django_basemodels.test_app.models import TestBaseModel
+from django_basemodels.utils import run_bulk_action
+
+
+@pytest.fixture
+def model_admin():
+    return HighScaleBaseModelAdmin(TestBaseModel, AdminSite())
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator_falls_back_to_exact_count():
+    """Тестируем что без статистики планировщика (не PostgreSQL) используется точный подсчёт"""
+    TestBaseModel.objects.create()
+    TestBaseModel.objects.create()
+
+    paginator = EstimatedCountPaginator(TestBaseModel.objects.order_by("-pk"), 10)
+    assert paginator.count == 2
+
+
+@pytest.mark.django_db
+def test_estimated_count_paginator_uses_estimate_for_large_tables(monkeypatch):
+    """Тестируем что для больших выборок берётся оценка планировщика"""
+    monkeypatch.setattr(admin_mod, "estimate_count", lambda queryset: 5_000_000)
+
+    paginator = EstimatedCountPaginator(TestBaseModel.objects.order_by("-pk"), 10)
+    assert paginator.count == 5_000_000
+
+
+@pytest.mark.django_db
+def test_high_scale_admin_queryset_is_not_polymorphic(model_admin):
+    """Тестируем что changelist не апкастит строки полиморфно"""
+    request = RequestFactory().get("/")
+    assert model_admin.get_queryset(request).polymorphic_disabled is True
+
+
+@pytest.mark.django_db
+def test_run_bulk_action_soft_deletes_objects():
+    """Тестируем массовое мягкое удаление одним UPDATE"""
+    a = TestBaseModel.objects.create()
+    b = TestBaseModel.objects.create()
+
+    assert run_bulk_action(TestBaseModel, "soft_delete", [a.pk]) == 1
+
+    assert set(TestBaseModel.objects.values_list("pk", flat=True)) == {b.pk}
+    assert TestBaseModel.deleted_objects.filter(pk=a.pk).exists()
+
+
+def test_run_bulk_action_rejects_unknown_action():
+    """Тестируем что запускать можно только разрешённые операции"""
+    with pytest.raises(ValueError):
+        run_bulk_action(TestBaseModel, "hard_delete", [1])
+
+
+@pytest.mark.django_db
+def test_schedule_bulk_action_runs_chunks_inline_without_celery(model_admin, monkeypatch):
+    """Тестируем что без Celery операция выполняется пачками в запросе"""
+    monkeypatch.setattr(admin_mod, "CELERY_AVAILABLE", False)
+    objs = [TestBaseModel.objects.create(is_active=True) for _ in range(5)]
+    model_admin.bulk_action_chunk_size = 2
+
+    with mock.patch.object(model_admin, "message_user") as mock_message:
+        model_admin.deactivate_in_background(RequestFactory().post("/"), TestBaseModel.objects.all())
+
+    assert not TestBaseModel.objects.filter(pk__in=[o.pk for o in objs], is_active=True).exists()
+    assert "3" in str(mock_message.call_args[0][1])
+
+
+@pytest.mark.django_db
+def test_schedule_bulk_action_refuses_large_selection_without_celery(model_admin, monkeypatch):
+    """Тестируем что без Celery слишком большая выборка не обрабатывается в запросе"""
+    monkeypatch.setattr(admin_mod, "CELERY_AVAILABLE", False)
+    objs = [TestBaseModel.objects.create(is_active=True) for _ in range(3)]
+    model_admin.inline_bulk_action_limit = 2
+
+    with mock.patch.object(model_admin, "message_user") as mock_message:
+        model_admin.deactivate_in_background(RequestFactory().post("/"), TestBaseModel.objects.all())
+
+    assert TestBaseModel.objects.filter(pk__in=[o.pk for o in objs], is_active=True).count() == 3
+    assert mock_message.call_args[1]["level"] == admin_mod.messages.ERROR
+
+
+@pytest.mark.django_db
+def test_schedule_bulk_action_enqueues_one_task_for_select_across(model_admin, monkeypatch):
+    """Тестируем что "выбрать все" ставит одну задачу с фильтрами changelist без чтения pk в запросе"""
+    monkeypatch.setattr(admin_mod, "CELERY_AVAILABLE", True)
+    monkeypatch.setattr(admin_mod, "celery_is_healthy", lambda: True)
+    request = RequestFactory().post("/?title=a&after=10", {"select_across": "1"})
+    request.user = User(pk=7)
+
+    with mock.patch.object(changelist_action_task, "delay") as mock_delay, \
+            mock.patch.object(model_admin, "message_user"):
+        model_admin.soft_delete_in_background(request, TestBaseModel.objects.all())
+
+    mock_delay.assert_called_once_with(
+        model_admin.admin_site.name, TestBaseModel._meta.label_lower, "soft_delete", "title=a", 7
+    )
+
+
+@pytest.mark.django_db
+def test_changelist_action_task_walks_filtered_queryset_in_chunks():
+    """Тестируем что фоновая задача восстанавливает фильтры changelist и обходит выборку пачками"""
+    site = AdminSite(name="bulk_actions")
+    site.register(TestBaseModel, HighScaleBaseModelAdmin)
+    site.get_model_admin(TestBaseModel).bulk_action_chunk_size = 2
+    user = User.objects.create(username="admin", is_staff=True, is_superuser=True)
+    selected = [TestBaseModel.objects.create(title="a", is_active=True) for _ in range(5)]
+    other = TestBaseModel.objects.create(title="b", is_active=True)
+
+    assert changelist_action_task(site.name, TestBaseModel._meta.label_lower, "deactivate", "title=a", user.pk) == 5
+
+    assert not TestBaseModel.objects.filter(pk__in=[o.pk for o in selected], is_active=True).exists()
+    assert TestBaseModel.objects.get(pk=other.pk).is_active is True
+
+
+@pytest.mark.django_db
+def test_keyset_changelist_loads_next_page_after_cursor(model_admin):
+    """Тестируем keyset-пагинацию changelist по курсору pk"""
+    objs = [TestBaseModel.objects.create() for _ in range(5)]
+    model_admin.list_per_page = 2
+
+    request = RequestFactory().get("/", {"after": objs[3].pk})
+    request.user = mock.MagicMock()
+    with mock.patch.object(model_admin, "get_preserved_filters", return_value=""):
+        cl = model_admin.get_changelist_instance(request)
+
+    assert [o.pk for o in cl.result_list] == [objs[2].pk, objs[1].pk]
+    assert cl.next_page_url == f"?after={objs[1].pk}"
+    assert cl.result_count == 5
+
+    request = RequestFactory().get("/", {"after": objs[1].pk})
+    request.user = mock.MagicMock()
+    with mock.patch.object(model_admin, "get_preserved_filters", return_value=""):
+        cl = model_admin.get_changelist_instance(request)
+
+    assert [o.pk for o in cl.result_list] == [objs[0].pk]
+    assert cl.next_page_url is None
+
+
+@pytest.mark.django_db
+def test_keyset_changelist_actions_ignore_cursor(model_admin):
+    """Тестируем что действие "выбрать все" на следующей странице относится ко всей выборке"""
+    objs = [TestBaseModel.objects.create() for _ in range(5)]
+    model_admin.list_per_page = 2
+
+    request = RequestFactory().post(f"/?after={objs[3].pk}", {"action": "soft_delete_in_background", "index": 0})
+    request.user = mock.MagicMock()
+    with mock.patch.object(model_admin, "get_preserved_filters", return_value=""):
+        cl = model_admin.get_changelist_instance(request)
+
+    assert cl.get_queryset(request).count() == 5
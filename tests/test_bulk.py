@@ -0,0 +1,101 @@
+import pytest
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel
+
+
+@pytest.mark.django_db
+def test_bulk_create_sets_ctype_and_timestamps():
+    """Тестируем массовую вставку в одну таблицу"""
+    objs = TestBaseModel.objects.bulk_create([TestBaseModel(title=f"t{i}") for i in range(3)])
+
+    assert all(obj.pk for obj in objs)
+    assert all(obj.created_at and obj.updated_at for obj in objs)
+    assert [type(o) for o in TestBaseModel.objects.all()] == [TestBaseModel] * 3
+
+
+@pytest.mark.django_db
+def test_bulk_create_multi_table_inherited_model():
+    """Тестируем массовую вставку multi-table наследника в родительскую и дочернюю таблицы"""
+    objs = TestChildModel.objects.bulk_create(
+        [TestChildModel(title=f"t{i}", extra=f"e{i}") for i in range(3)],
+        batch_size=2,
+    )
+
+    assert len({obj.pk for obj in objs}) == 3
+    loaded = list(TestBaseModel.objects.order_by("pk"))
+    assert [type(o) for o in loaded] == [TestChildModel] * 3
+    assert [(o.title, o.extra) for o in loaded] == [("t0", "e0"), ("t1", "e1"), ("t2", "e2")]
+
+
+@pytest.mark.django_db
+def test_bulk_create_mixed_parent_and_child_objects():
+    """Тестируем что наследники в пачке родительского queryset вставляются и в дочернюю таблицу"""
+    objs = TestBaseModel.objects.bulk_create(
+        [TestBaseModel(title="parent"), TestChildModel(title="child", extra="x"), TestBaseModel(title="parent2")]
+    )
+
+    assert len({obj.pk for obj in objs}) == 3
+    assert [(type(o), o.title) for o in TestBaseModel.objects.order_by("pk")] == [
+        (TestBaseModel, "parent"), (TestChildModel, "child"), (TestBaseModel, "parent2")
+    ]
+    assert TestChildModel.objects.get().extra == "x"
+
+
+def test_bulk_create_rejects_objects_of_other_models():
+    """Тестируем что объекты не из иерархии модели queryset не вставляются"""
+    with pytest.raises(ValueError):
+        TestChildModel.objects.bulk_create([TestChildModel(), TestBaseModel()])
+
+
+@pytest.mark.django_db
+def test_bulk_create_validates_activity_ranges():
+    """Тестируем проверку интервалов активности для всей пачки"""
+    now = timezone.now()
+    objs = [
+        TestBaseModel(active_start=now, active_end=now + timezone.timedelta(days=1)),
+        TestBaseModel(active_start=now, active_end=now - timezone.timedelta(days=1)),
+    ]
+
+    with pytest.raises(ValidationError):
+        TestBaseModel.objects.bulk_create(objs)
+    assert not TestBaseModel.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_update_multi_table_fields_and_updated_at():
+    """Тестируем массовое обновление полей обеих таблиц наследника"""
+    objs = TestChildModel.objects.bulk_create([TestChildModel(title="t"), TestChildModel(title="t")])
+    before = max(obj.updated_at for obj in objs)
+
+    for obj in objs:
+        obj.title = "changed"
+        obj.extra = "changed"
+    TestChildModel.objects.bulk_update(objs, ["title", "extra"])
+
+    for obj in TestChildModel.objects.all():
+        assert (obj.title, obj.extra) == ("changed", "changed")
+        assert obj.updated_at >= before
+
+
+@pytest.mark.django_db
+def test_bulk_update_saves_same_updated_at_as_objects():
+    """Тестируем что updated_at в БД совпадает с выставленным в объектах для всех пачек"""
+    objs = TestBaseModel.objects.bulk_create([TestBaseModel(title="t") for _ in range(3)])
+    for obj in objs:
+        obj.title = "changed"
+    TestBaseModel.objects.bulk_update(objs, ["title"], batch_size=1)
+
+    assert {obj.updated_at for obj in objs} == set(TestBaseModel.objects.values_list("updated_at", flat=True))
+    assert len({obj.updated_at for obj in objs}) == 1
+
+
+@pytest.mark.django_db
+def test_bulk_update_validates_activity_ranges():
+    """Тестируем проверку интервалов активности при массовом обновлении"""
+    obj = TestBaseModel.objects.create()
+    obj.active_start = timezone.now()
+    obj.active_end = obj.active_start - timezone.timedelta(days=1)
+
+    with pytest.raises(ValidationError):
+        TestBaseModel.objects.bulk_update([obj], ["active_start", "active_end"])
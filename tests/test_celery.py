@@ -1,7 +1,12 @@
 from unittest import mock
 
 import pytest
-from django_basemodels.celery import get_models_with_activity, update_activity_status_task, update_model_activity_task
+from django_basemodels.celery import (
+    get_models_with_activity,
+    merge_activity_results_task,
+    update_activity_status_task,
+    update_model_activity_task,
+)
 from django_basemodels.test_app.models import TestBaseModel
 
 
@@ -82,3 +87,51 @@ def test_update_activity_status_task_no_models():
 
         # Проверяем возвращаемое значение
         assert result == "No models to update"
+
+
+@pytest.mark.django_db
+def test_update_activity_status_task_batches_cells_with_concurrency(settings):
+    """Тестируем ограничение числа задач при веерном обновлении по схемам"""
+    settings.BASEMODELS_ACTIVITY_SCHEMAS = ["tenant_a", "tenant_b", "tenant_c"]
+    settings.BASEMODELS_ACTIVITY_CONCURRENCY = 2
+
+    with (
+        mock.patch("django_basemodels.celery.get_models_with_activity", return_value=[TestBaseModel]),
+        mock.patch("django_basemodels.celery.group") as mock_group,
+    ):
+        result = update_activity_status_task()
+
+    tasks = mock_group.call_args[0][0]
+    assert len(tasks) == 2
+    assert sorted(cell[1] for task in tasks for cell in task.args[0]) == ["tenant_a", "tenant_b", "tenant_c"]
+    assert result == "Started update for 1 models on 3 targets"
+
+
+@pytest.mark.django_db
+def test_update_activity_status_task_uses_chord_with_result_backend():
+    """Тестируем что при настроенном result backend матрица результатов собирается chord'ом"""
+    with (
+        mock.patch("django_basemodels.celery.get_models_with_activity", return_value=[TestBaseModel]),
+        mock.patch("django_basemodels.celery.results_backend_enabled", return_value=True),
+        mock.patch("django_basemodels.celery.chord") as mock_chord,
+        mock.patch("django_basemodels.celery.group") as mock_group,
+    ):
+        update_activity_status_task()
+
+    mock_group.assert_not_called()
+    tasks = mock_chord.call_args[0][0]
+    assert [task.args[0] for task in tasks] == [[("default", None, TestBaseModel._meta.label_lower)]]
+    callback = mock_chord.return_value.call_args[0][0]
+    assert callback.task == "django_basemodels.merge_activity_results"
+
+
+def test_merge_activity_results_task_merges_matrices():
+    """Тестируем сборку матрицы результатов из матриц задач группы"""
+    results = [
+        {"default:tenant_a": {"app.a": 1}, "default:tenant_b": {"app.a": {"error": "boom"}}},
+        {"default:tenant_a": {"app.b": 2}},
+    ]
+    assert merge_activity_results_task(results) == {
+        "default:tenant_a": {"app.a": 1, "app.b": 2},
+        "default:tenant_b": {"app.a": {"error": "boom"}},
+    }
@@ -0,0 +1,92 @@
+import pytest
+from django.utils import timezone
+from django_basemodels.query import Change
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel, TestCodeModel
+
+
+def _read_all(cursor=None, limit=2):
+    """Читает ленту изменений до конца постранично"""
+    changes = []
+    while True:
+        page = TestBaseModel.objects.changes_since(cursor, limit=limit)
+        changes.extend(page.changes)
+        cursor = page.cursor
+        if not page.has_more:
+            return changes, cursor
+
+
+@pytest.mark.django_db
+def test_changes_since_pages_through_all_rows_in_order():
+    """Тестируем постраничное чтение ленты без пропусков и повторов"""
+    objs = [TestBaseModel.objects.create(title=str(i)) for i in range(5)]
+
+    changes, cursor = _read_all()
+
+    assert [c.obj.pk for c in changes] == [o.pk for o in objs]
+    assert {c.kind for c in changes} == {Change.CREATED}
+    assert TestBaseModel.objects.changes_since(cursor).changes == []
+
+
+@pytest.mark.django_db
+def test_changes_since_handles_updated_at_ties():
+    """Тестируем что строки с одинаковым updated_at не теряются между страницами"""
+    objs = [TestBaseModel.objects.create() for _ in range(3)]
+    TestBaseModel.objects.all().update(title="same-time")
+
+    changes, _ = _read_all(limit=1)
+
+    assert sorted(c.obj.pk for c in changes) == sorted(o.pk for o in objs)
+
+
+@pytest.mark.django_db
+def test_changes_since_reports_updated_inactive_and_deleted():
+    """Тестируем виды изменений после курсора"""
+    updated = TestBaseModel.objects.create()
+    deactivated = TestChildModel.objects.create()
+    updated_inactive = TestBaseModel.objects.create(is_active=False)
+    deleted = TestBaseModel.objects.create()
+    _, cursor = _read_all()
+
+    TestBaseModel.objects.filter(pk__in=[updated.pk, updated_inactive.pk]).update(title="changed")
+    deactivated.deactivate()
+    TestBaseModel.objects.filter(pk=deleted.pk).soft_delete()
+    created = TestBaseModel.objects.create()
+
+    changes, _ = _read_all(cursor)
+
+    assert {c.obj.pk: c.kind for c in changes} == {
+        updated.pk: Change.UPDATED,
+        deactivated.pk: Change.INACTIVE,
+        updated_inactive.pk: Change.INACTIVE,
+        deleted.pk: Change.DELETED,
+        created.pk: Change.CREATED,
+    }
+    assert isinstance(next(c.obj for c in changes if c.obj.pk == deactivated.pk), TestChildModel)
+
+
+@pytest.mark.django_db
+def test_changes_since_includes_activity_transitions():
+    """Тестируем что пересчёт активности попадает в ленту изменений"""
+    obj = TestBaseModel.objects.create(is_active=True, active_end=timezone.now() - timezone.timedelta(days=1))
+    _, cursor = _read_all()
+
+    TestBaseModel.objects.update_activity_status()
+
+    changes, _ = _read_all(cursor)
+    assert [(c.obj.pk, c.kind) for c in changes] == [(obj.pk, Change.INACTIVE)]
+
+
+def test_changes_since_rejects_invalid_cursor():
+    """Тестируем ошибку на повреждённом курсоре"""
+    with pytest.raises(ValueError):
+        TestBaseModel.objects.changes_since("not-a-cursor")
+
+
+def test_keyset_index_uses_concrete_primary_key():
+    """Тестируем что индекс (updated_at, pk) строится по первичному ключу конкретной модели"""
+    def keyset_fields(model):
+        return [list(index.fields) for index in model._meta.indexes if index.fields[0] == "updated_at"]
+
+    assert keyset_fields(TestBaseModel) == [["updated_at", "id"]]
+    assert keyset_fields(TestCodeModel) == [["updated_at", "code"]]
+    assert keyset_fields(TestChildModel) == []
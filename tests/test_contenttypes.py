@@ -0,0 +1,63 @@
+import pytest
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_basemodels import contenttypes as ctypes_mod
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel
+
+
+@pytest.fixture(autouse=True)
+def clean_ctype_maps():
+    ctypes_mod.clear_ctype_maps()
+    yield
+    ctypes_mod.clear_ctype_maps()
+
+
+def _ctype_queries(queries):
+    return [q for q in queries if "django_content_type" in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_ctype_map_is_immutable_and_covers_models():
+    """Тестируем карту ctype_id -> модель для всех моделей с активностью"""
+    models = ctypes_mod.get_ctype_models()
+
+    assert set(models.values()) >= {TestBaseModel, TestChildModel}
+    with pytest.raises(TypeError):
+        models[0] = TestBaseModel
+
+
+@pytest.mark.django_db
+def test_ctype_map_is_built_once_per_process():
+    """Тестируем что карта строится один раз"""
+    ctypes_mod.get_ctype_map()
+
+    with CaptureQueriesContext(connection) as ctx:
+        ctypes_mod.get_ctype_map()
+
+    assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_polymorphic_loading_uses_pinned_ctypes_after_cache_clear():
+    """Тестируем полиморфную загрузку без запросов к ContentType после очистки кэша"""
+    TestBaseModel.objects.create()
+    TestChildModel.objects.create()
+    ctypes_mod.warm_ctypes()
+    ContentType.objects.clear_cache()
+
+    with CaptureQueriesContext(connection) as ctx:
+        loaded = list(TestBaseModel.objects.order_by("pk"))
+        list(TestBaseModel.objects.instance_of(TestChildModel))
+
+    assert [type(o) for o in loaded] == [TestBaseModel, TestChildModel]
+    assert _ctype_queries(ctx.captured_queries) == []
+
+
+def test_warm_ctypes_logs_errors(monkeypatch, caplog):
+    """Тестируем что ошибка прогрева не пробрасывается"""
+    monkeypatch.setattr(ctypes_mod, "get_ctype_map", lambda using: (_ for _ in ()).throw(Exception("db down")))
+
+    ctypes_mod.warm_ctypes()
+
+    assert "Failed to warm BaseModel content types" in caplog.text
@@ -0,0 +1,208 @@
+import pytest
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_basemodels import counters
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel
+from safedelete.config import SOFT_DELETE
+
+
+@pytest.fixture(autouse=True)
+def enable_counters(settings):
+    settings.BASEMODELS_ACTIVITY_COUNTERS = True
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _counts(model=TestBaseModel):
+    return model.objects.active_count(), model.objects.inactive_count()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counts_are_cached_after_first_read():
+    """Тестируем что после первого точного подсчёта счётчики читаются из кэша"""
+    TestBaseModel.objects.create(is_active=True)
+    TestBaseModel.objects.create(is_active=False)
+    assert _counts() == (1, 1)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert _counts() == (1, 1)
+    assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counters_follow_create_activate_deactivate_and_delete():
+    """Тестируем инкрементальную корректировку счётчиков"""
+    obj = TestBaseModel.objects.create(is_active=True)
+    assert _counts() == (1, 0)
+
+    other = TestBaseModel.objects.create(is_active=False)
+    obj.deactivate()
+    assert _counts() == (0, 2)
+
+    TestBaseModel.objects.activate()
+    assert _counts() == (2, 0)
+
+    TestBaseModel.objects.filter(pk=other.pk).deactivate()
+    assert _counts() == (1, 1)
+
+    TestBaseModel.objects.filter(pk=other.pk).soft_delete()
+    obj.refresh_from_db()
+    obj.delete()
+    assert _counts() == (0, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counters_follow_update_activity_status_and_bulk_create():
+    """Тестируем корректировку при пересчёте активности и массовой вставке"""
+    past = timezone.now() - timezone.timedelta(days=1)
+    assert _counts() == (0, 0)
+
+    TestBaseModel.objects.bulk_create([
+        TestBaseModel(is_active=False, active_start=past),
+        TestBaseModel(is_active=True, active_end=past),
+        TestBaseModel(is_active=True),
+    ])
+    assert _counts() == (2, 1)
+
+    TestBaseModel.objects.update_activity_status()
+    assert _counts() == (2, 1)
+    assert TestBaseModel.objects.filter(is_active=True).count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+def test_child_rows_are_counted_for_parent_model():
+    """Тестируем что строки потомка учитываются в счётчиках предка"""
+    assert _counts() == (0, 0)
+    assert _counts(TestChildModel) == (0, 0)
+
+    TestChildModel.objects.create(is_active=True)
+
+    assert _counts() == (1, 0)
+    assert _counts(TestChildModel) == (1, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_soft_deleted_rows_do_not_change_counters():
+    """Тестируем что пересчёт активности мягко удалённых строк не меняет счётчики"""
+    past = timezone.now() - timezone.timedelta(days=1)
+    obj = TestBaseModel.objects.create(is_active=True, active_end=past)
+    TestBaseModel.objects.filter(pk=obj.pk).soft_delete()
+    assert _counts() == (0, 0)
+
+    assert TestBaseModel.objects.update_activity_status() == 1
+    assert _counts() == (0, 0)
+
+    TestBaseModel.all_objects.activate()
+    assert _counts() == (0, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parent_queryset_changes_adjust_child_counters():
+    """Тестируем что массовые изменения через queryset предка корректируют счётчики потомка"""
+    past = timezone.now() - timezone.timedelta(days=1)
+    TestChildModel.objects.create(is_active=True)
+    TestBaseModel.objects.create(is_active=True)
+    assert _counts(TestChildModel) == (1, 0)
+
+    TestBaseModel.objects.deactivate()
+    assert _counts(TestChildModel) == (0, 1)
+    assert _counts() == (0, 2)
+
+    TestBaseModel.objects.activate()
+    TestChildModel.objects.update(active_end=past)
+    TestBaseModel.objects.update_activity_status()
+    assert _counts(TestChildModel) == (0, 1)
+    assert _counts() == (1, 1)
+
+    TestBaseModel.objects.soft_delete()
+    assert _counts(TestChildModel) == (0, 0)
+    assert _counts() == (0, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_counters_follow_plain_save():
+    """Тестируем корректировку при изменении is_active и мягком удалении через save()"""
+    obj = TestChildModel(is_active=True)
+    obj.is_active = False
+    TestBaseModel.objects.bulk_create([obj])
+    assert _counts(TestChildModel) == (0, 1)
+
+    obj.is_active = True
+    obj.save()
+    assert _counts(TestChildModel) == (1, 0)
+    assert _counts() == (1, 0)
+
+    obj.is_active = False
+    obj.save(update_fields=["title"])
+    assert _counts() == (1, 0)
+    obj.save(update_fields=["is_active"])
+    assert _counts() == (0, 1)
+
+    obj.delete(force_policy=SOFT_DELETE)
+    assert _counts() == (0, 0)
+    obj.undelete()
+    assert _counts() == (0, 1)
+
+    obj.refresh_from_db()
+    obj.delete()
+    assert _counts() == (0, 0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_counters_are_recounted():
+    """Тестируем точный пересчёт устаревших счётчиков"""
+    assert _counts() == (0, 0)
+    # изменение в обход BaseModel API счётчики не видят
+    TestBaseModel.objects.bulk_create([TestBaseModel(is_active=True)])
+    cache.clear()
+    TestBaseModel.objects.all().update(is_active=False)
+
+    assert TestBaseModel.objects.inactive_count(max_age=0) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_approx_falls_back_without_planner_estimates():
+    """Тестируем approx=True на СУБД без оценок планировщика"""
+    TestBaseModel.objects.create(is_active=True)
+
+    assert TestBaseModel.objects.active_count(approx=True) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_other_managers_are_counted_exactly(settings):
+    """Тестируем что all_objects и отключённые счётчики считают COUNT"""
+    obj = TestBaseModel.objects.create(is_active=True)
+    TestBaseModel.objects.filter(pk=obj.pk).soft_delete()
+
+    assert TestBaseModel.all_objects.active_count() == 1
+
+    settings.BASEMODELS_ACTIVITY_COUNTERS = False
+    assert TestBaseModel.objects.active_count() == 0
+    assert counters.get_counts(TestBaseModel, "default", 300) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rolled_back_changes_do_not_adjust_counters():
+    """Тестируем что корректировки применяются только после фиксации транзакции"""
+    obj = TestBaseModel.objects.create(is_active=True)
+    assert _counts() == (1, 0)
+
+    with pytest.raises(RuntimeError), transaction.atomic():
+        TestBaseModel.objects.create(is_active=False)
+        TestBaseModel.objects.filter(pk=obj.pk).deactivate()
+        TestBaseModel.objects.soft_delete()
+        raise RuntimeError
+
+    assert _counts() == (1, 0)
+
+
+def test_counters_are_refused_with_activity_schemas(settings):
+    """Тестируем что счётчики не включаются вместе со схемами тенантов"""
+    settings.BASEMODELS_ACTIVITY_SCHEMAS = ["tenant_a", "tenant_b"]
+
+    with pytest.raises(ImproperlyConfigured):
+        counters.counters_enabled()
@@ -0,0 +1,138 @@
+import pytest
+from django.utils import timezone
+from django_basemodels.models import ActivityTransition
+from django_basemodels.outbox import drain_transitions
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel
+
+
+@pytest.fixture
+def enable_outbox(settings):
+    settings.BASEMODELS_ACTIVITY_OUTBOX = True
+
+
+def _transitions():
+    return sorted(
+        ((t.model, int(t.object_pk), t.is_active) for t in ActivityTransition.objects.all()), key=lambda t: t[1]
+    )
+
+
+@pytest.mark.django_db
+def test_nothing_is_recorded_without_setting():
+    """Тестируем что без BASEMODELS_ACTIVITY_OUTBOX записи не создаются"""
+    obj = TestBaseModel.objects.create(is_active=True)
+    obj.deactivate()
+    TestBaseModel.objects.activate()
+    TestBaseModel.objects.update_activity_status()
+    assert not ActivityTransition.objects.exists()
+
+
+@pytest.mark.django_db
+def test_activate_and_deactivate_record_only_changed_objects(enable_outbox):
+    """Тестируем что activate()/deactivate() записывают переходы только изменившихся объектов"""
+    active = TestBaseModel.objects.create(is_active=True)
+    inactive = TestBaseModel.objects.create(is_active=False)
+
+    TestBaseModel.objects.activate()
+    assert _transitions() == [(TestBaseModel, inactive.pk, True)]
+
+    ActivityTransition.objects.all().delete()
+    active.refresh_from_db()
+    active.deactivate()
+    active.deactivate()
+    TestBaseModel.objects.filter(pk=inactive.pk).activate()
+    assert _transitions() == [(TestBaseModel, active.pk, False)]
+
+
+@pytest.mark.django_db
+def test_update_activity_status_records_transitions_in_batches(enable_outbox):
+    """Тестируем что пересчёт активности пачками записывает переходы с моделью потомка"""
+    now = timezone.now()
+    past, future = now - timezone.timedelta(days=1), now + timezone.timedelta(days=1)
+    to_activate = [TestBaseModel.objects.create(is_active=False, active_start=past) for _ in range(3)]
+    to_deactivate = TestChildModel.objects.create(is_active=True, active_start=future)
+    unchanged = TestBaseModel.objects.create(is_active=True, active_start=past)
+
+    assert TestBaseModel.objects.update_activity_status(batch_size=2) == 4
+    assert _transitions() == sorted(
+        [(TestBaseModel, obj.pk, True) for obj in to_activate] + [(TestChildModel, to_deactivate.pk, False)],
+        key=lambda t: t[1],
+    )
+    assert set(ActivityTransition.objects.values_list("at", flat=True)) == {
+        TestBaseModel.objects.get(pk=to_activate[0].pk).updated_at
+    }
+    assert not ActivityTransition.objects.filter(object_pk=str(unchanged.pk)).exists()
+
+
+@pytest.mark.django_db
+def test_drain_transitions_processes_batches_in_order(enable_outbox):
+    """Тестируем что drain_transitions() передаёт пачки по порядку и удаляет их"""
+    objs = [TestBaseModel.objects.create(is_active=False) for _ in range(5)]
+    for obj in objs:
+        obj.activate()
+
+    batches = []
+    assert drain_transitions(lambda batch: batches.append([int(t.object_pk) for t in batch]), batch_size=2) == 5
+    assert batches == [[objs[0].pk, objs[1].pk], [objs[2].pk, objs[3].pk], [objs[4].pk]]
+    assert not ActivityTransition.objects.exists()
+
+
+@pytest.mark.django_db
+def test_drain_transitions_keeps_batch_when_handler_fails(enable_outbox):
+    """Тестируем что при ошибке обработчика пачка остаётся в outbox"""
+    for _ in range(3):
+        TestBaseModel.objects.create(is_active=False).activate()
+
+    def handler(batch):
+        raise RuntimeError("search is down")
+
+    with pytest.raises(RuntimeError):
+        drain_transitions(handler, batch_size=2)
+    assert ActivityTransition.objects.count() == 3
+
+    assert drain_transitions(lambda batch: None, limit=2) == 2
+    assert ActivityTransition.objects.count() == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("outbox_enabled", [False, True])
+def test_update_activity_status_refreshes_soft_deleted_rows(settings, outbox_enabled):
+    """Тестируем что outbox не меняет набор строк, которые обновляет update_activity_status()"""
+    settings.BASEMODELS_ACTIVITY_OUTBOX = outbox_enabled
+    obj = TestBaseModel.objects.create(is_active=True, active_end=timezone.now() - timezone.timedelta(days=1))
+    TestBaseModel.objects.filter(pk=obj.pk).soft_delete()
+
+    assert TestBaseModel.objects.update_activity_status() == 1
+    assert TestBaseModel.all_objects.get(pk=obj.pk).is_active is False
+    assert ActivityTransition.objects.count() == int(outbox_enabled)
+
+
+@pytest.mark.django_db
+def test_plain_save_records_transition(enable_outbox):
+    """Тестируем что смена is_active через save() записывает переход, а прочие сохранения — нет"""
+    obj = TestChildModel.objects.create(is_active=True)
+    obj.title = "changed"
+    obj.save()
+    assert not ActivityTransition.objects.exists()
+
+    obj.is_active = False
+    obj.save()
+    assert ActivityTransition.objects.get().at == TestChildModel.objects.get(pk=obj.pk).updated_at
+
+    obj.deactivate()
+    assert _transitions() == [(TestChildModel, obj.pk, False)]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("outbox_enabled", [False, True])
+def test_queryset_activate_skips_rows_already_in_state(settings, outbox_enabled):
+    """Тестируем что activate() не трогает уже активные объекты и пишет переход со временем updated_at"""
+    settings.BASEMODELS_ACTIVITY_OUTBOX = outbox_enabled
+    active = TestBaseModel.objects.create(is_active=True)
+    inactive = TestBaseModel.objects.create(is_active=False)
+    active_updated_at = TestBaseModel.objects.get(pk=active.pk).updated_at
+
+    assert TestBaseModel.objects.activate() == 1
+
+    assert TestBaseModel.objects.get(pk=active.pk).updated_at == active_updated_at
+    if outbox_enabled:
+        assert ActivityTransition.objects.get().at == TestBaseModel.objects.get(pk=inactive.pk).updated_at
@@ -0,0 +1,77 @@
+import pytest
+from django_basemodels import query as query_mod
+from django_basemodels.pagination import KeysetPaginator
+from django_basemodels.test_app.models import TestBaseModel, TestCodeModel
+
+
+@pytest.mark.django_db
+def test_keyset_paginator_walks_all_pages_newest_first():
+    """Тестируем обход всех страниц от новых к старым без пропусков и повторов"""
+    objs = [TestBaseModel.objects.create(title=str(i)) for i in range(5)]
+    paginator = KeysetPaginator(TestBaseModel.objects.all(), per_page=2)
+
+    seen, cursor = [], None
+    while True:
+        page = paginator.page(cursor)
+        seen.extend(o.pk for o in page.object_list)
+        if not page.has_next:
+            break
+        cursor = page.next_cursor
+
+    assert seen == [o.pk for o in reversed(objs)]
+
+
+@pytest.mark.django_db
+def test_keyset_paginator_handles_updated_at_ties():
+    """Тестируем страницы при одинаковом updated_at"""
+    objs = [TestBaseModel.objects.create() for _ in range(3)]
+    TestBaseModel.objects.all().update(title="same-time")
+    paginator = KeysetPaginator(TestBaseModel.objects.all(), per_page=1)
+
+    first = paginator.page()
+    second = paginator.page(first.next_cursor)
+    third = paginator.page(second.next_cursor)
+
+    assert [p.object_list[0].pk for p in (first, second, third)] == [o.pk for o in reversed(objs)]
+    assert third.has_next is False
+
+
+@pytest.mark.django_db
+def test_keyset_paginator_respects_active_and_soft_delete(monkeypatch):
+    """Тестируем что фильтры active() и видимость soft-delete сохраняются"""
+    monkeypatch.setattr(query_mod, "celery_is_healthy", lambda: True)
+    active = TestBaseModel.objects.create(is_active=True)
+    TestBaseModel.objects.create(is_active=False)
+    deleted = TestBaseModel.objects.create(is_active=True)
+    TestBaseModel.objects.filter(pk=deleted.pk).soft_delete()
+
+    page = KeysetPaginator(TestBaseModel.objects.active(), per_page=10).page()
+
+    assert [o.pk for o in page.object_list] == [active.pk]
+
+
+def test_keyset_paginator_rejects_non_positive_page_size():
+    """Тестируем проверку размера страницы"""
+    with pytest.raises(ValueError):
+        KeysetPaginator(TestBaseModel.objects.all(), per_page=0)
+
+
+def test_unordered_drops_default_ordering():
+    """Тестируем сброс сортировки по умолчанию для массовых операций"""
+    assert TestBaseModel.objects.all().unordered().query.order_by == ()
+    assert TestBaseModel.objects.all().unordered().query.default_ordering is False
+
+
+@pytest.mark.django_db
+def test_default_ordering_and_paginator_with_custom_primary_key():
+    """Тестируем сортировку по умолчанию и пагинацию модели с первичным ключом не id"""
+    for code in ("a", "b", "c"):
+        TestCodeModel.objects.create(code=code)
+    TestCodeModel.objects.all().update()  # одинаковый updated_at — порядок решает pk
+
+    assert [obj.code for obj in TestCodeModel.objects.all()] == ["c", "b", "a"]
+
+    paginator = KeysetPaginator(TestCodeModel.objects.all(), per_page=2)
+    first = paginator.page()
+    second = paginator.page(first.next_cursor)
+    assert [obj.code for obj in first.object_list + second.object_list] == ["c", "b", "a"]
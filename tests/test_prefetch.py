@@ -0,0 +1,70 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel, TestRelatedModel
+
+
+@pytest.fixture
+def celery_down(monkeypatch):
+    monkeypatch.setattr("django_basemodels.query.celery_is_healthy", lambda: False)
+
+
+@pytest.mark.django_db
+def test_prefetch_active_skips_inactive_and_deleted():
+    """Тестируем что prefetch_active() подгружает только активные не удалённые объекты"""
+    parent = TestBaseModel.objects.create()
+    active = TestRelatedModel.objects.create(parent=parent, is_active=True)
+    TestRelatedModel.objects.create(parent=parent, is_active=False)
+    TestRelatedModel.objects.create(parent=parent, is_active=True).delete()
+
+    parents = list(TestBaseModel.objects.filter(pk=parent.pk).prefetch_active("related"))
+    with CaptureQueriesContext(connection) as ctx:
+        assert [obj.pk for obj in parents[0].related.all()] == [active.pk]
+    assert len(ctx.captured_queries) == 0
+
+
+@pytest.mark.django_db
+def test_prefetch_active_pins_time_predicate_to_one_moment(celery_down):
+    """Тестируем что при недоступном Celery используется условие по времени на момент now"""
+    now = timezone.now()
+    parent = TestBaseModel.objects.create()
+    current = TestRelatedModel.objects.create(parent=parent, active_start=now - timezone.timedelta(days=1))
+    TestRelatedModel.objects.create(parent=parent, active_start=now + timezone.timedelta(days=1))
+
+    parent = TestBaseModel.objects.prefetch_active("related", now=now).get(pk=parent.pk)
+    assert [obj.pk for obj in parent.related.all()] == [current.pk]
+
+    later = now + timezone.timedelta(days=2)
+    parent = TestBaseModel.objects.prefetch_active("related", now=later).get(pk=parent.pk)
+    assert parent.related.count() == 2
+
+
+@pytest.mark.django_db
+def test_prefetch_active_loads_each_level_in_one_query():
+    """Тестируем вложенные связи, полиморфный апкаст и связи с моделями не из BaseModel"""
+    user = User.objects.create(username="owner")
+    parents = [TestBaseModel.objects.create(), TestChildModel.objects.create()]
+    for parent in parents:
+        TestRelatedModel.objects.create(parent=parent, owner=user)
+    TestRelatedModel.objects.create(parent=parents[0], is_active=False)
+
+    with CaptureQueriesContext(connection) as ctx:
+        related = list(TestRelatedModel.objects.active().prefetch_active("parent", "owner"))
+    # related + parent + апкаст TestChildModel + owner
+    assert len(ctx.captured_queries) == 4
+    assert {type(obj.parent) for obj in related} == {TestBaseModel, TestChildModel}
+    assert {obj.owner for obj in related} == {user}
+
+    with CaptureQueriesContext(connection) as ctx:
+        parents = list(TestBaseModel.objects.prefetch_active("related__parent"))
+    # родители + апкаст + related; related__parent уже заполнен обратной связью
+    assert len(ctx.captured_queries) == 3
+    assert sum(len(parent.related.all()) for parent in parents) == 2
+
+
+def test_prefetch_active_rejects_unknown_relation():
+    """Тестируем ошибку для несуществующей связи"""
+    with pytest.raises(ValueError):
+        TestBaseModel.objects.prefetch_active("missing")
@@ -0,0 +1,128 @@
+import warnings
+
+import pytest
+from django.db import connection
+from django.db.models import Count
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django_basemodels import query as query_mod
+from django_basemodels.profiling import QueryBudgetExceeded, QueryProfile, QueryProfilerMiddleware
+from django_basemodels.test_app.models import TestBaseModel, TestChildModel
+
+
+@pytest.mark.django_db
+def test_profile_counts_basemodel_and_polymorphic_queries():
+    """Тестируем подсчёт запросов BaseModelQuerySet и полиморфного апкаста"""
+    TestBaseModel.objects.create()
+    TestChildModel.objects.create()
+
+    with QueryProfile() as profile:
+        list(TestBaseModel.objects.all())
+
+    assert profile.counters["basemodel_queries"] == 2
+    assert profile.counters["polymorphic_queries"] == 1
+    assert profile.counters["queries"] == 2
+
+
+@pytest.mark.django_db
+def test_profile_counts_queries_outside_fetch_all():
+    """Тестируем подсчёт запросов count/exists/aggregate/iterator/update, минующих _fetch_all"""
+    TestBaseModel.objects.create()
+
+    with QueryProfile() as profile:
+        TestBaseModel.objects.count()
+        TestBaseModel.objects.filter(pk=0).exists()
+        TestBaseModel.objects.aggregate(total=Count("pk"))
+        list(TestBaseModel.objects.non_polymorphic().iterator())
+        TestBaseModel.objects.update(title="changed")
+        TestBaseModel.objects.update_activity_status()
+
+    assert profile.counters["basemodel_queries"] == profile.counters["queries"] == 7
+
+
+@pytest.mark.django_db
+def test_profile_iterator_does_not_count_queries_between_items():
+    """Тестируем что запросы в теле цикла по iterator() не относятся к basemodel_queries"""
+    TestBaseModel.objects.create()
+    TestBaseModel.objects.create()
+
+    with QueryProfile() as profile:
+        for _obj in TestBaseModel.objects.non_polymorphic().iterator(chunk_size=1):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+    assert profile.counters["basemodel_queries"] == 1
+    assert profile.counters["queries"] == 3
+
+
+@pytest.mark.django_db
+def test_profile_counts_health_checks_and_fallbacks(monkeypatch):
+    """Тестируем подсчёт проверок Celery и переходов на условие по временным полям"""
+    monkeypatch.setattr(query_mod, "celery_is_healthy", lambda: False)
+
+    with QueryProfile() as profile:
+        TestBaseModel.objects.active()
+        TestBaseModel.objects.inactive()
+
+    assert profile.counters["time_predicate_fallbacks"] == 2
+
+
+def test_profile_counts_real_health_check_calls():
+    """Тестируем подсчёт вызовов celery_is_healthy"""
+    from django_basemodels.utils import celery_is_healthy
+
+    with QueryProfile() as profile:
+        celery_is_healthy()
+        celery_is_healthy()
+
+    assert profile.counters["health_checks"] == 2
+
+
+@pytest.mark.django_db
+def test_profile_raises_when_budget_exceeded():
+    """Тестируем падение при превышении бюджета"""
+    TestChildModel.objects.create()
+
+    with pytest.raises(QueryBudgetExceeded, match="polymorphic_queries=1"):
+        with QueryProfile(budget={"polymorphic_queries": 0}):
+            list(TestBaseModel.objects.all())
+
+
+@pytest.mark.django_db
+def test_profile_warns_when_budget_exceeded_in_warn_mode():
+    """Тестируем предупреждение при превышении бюджета в режиме warn"""
+    with pytest.warns(RuntimeWarning, match="queries=1"):
+        with QueryProfile(budget={"queries": 0}, mode="warn"):
+            list(TestBaseModel.objects.all())
+
+
+def test_profile_rejects_unknown_counters():
+    """Тестируем проверку имён счётчиков бюджета"""
+    with pytest.raises(ValueError):
+        QueryProfile(budget={"n_plus_one": 1})
+
+
+@pytest.mark.django_db
+def test_middleware_attaches_profile_to_request(settings):
+    """Тестируем профилирование запроса в middleware"""
+    settings.BASEMODELS_QUERY_BUDGET = {"queries": 5}
+
+    def view(request):
+        list(TestBaseModel.objects.all())
+        return HttpResponse()
+
+    request = RequestFactory().get("/articles/")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        QueryProfilerMiddleware(view)(request)
+
+    assert request.basemodels_profile.counters["basemodel_queries"] == 1
+
+
+@pytest.mark.django_db
+def test_basemodels_profiler_fixture(basemodels_profiler):
+    """Тестируем pytest-фикстуру профилирования"""
+    with basemodels_profiler(queries=1) as profile:
+        list(TestBaseModel.objects.all())
+
+    assert profile.counters["queries"] == 1
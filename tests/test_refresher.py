@@ -0,0 +1,86 @@
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+from django_basemodels import query as query_mod
+from django_basemodels import refresher as refresher_mod
+from django_basemodels.refresher import ActivityRefresher, activity_is_fresh
+from django_basemodels.test_app.models import TestBaseModel
+
+
+@pytest.fixture(autouse=True)
+def clean_refresher_state(settings, monkeypatch):
+    settings.BASEMODELS_ACTIVITY_REFRESHER = True
+    monkeypatch.setattr(refresher_mod, "_fresh_checked_at", 0.0)
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_run_once_skips_when_celery_is_healthy(monkeypatch):
+    """Тестируем что при работающем Celery обновлятель ничего не делает"""
+    monkeypatch.setattr(refresher_mod, "celery_is_healthy", lambda: True)
+
+    assert ActivityRefresher().run_once() is None
+    assert activity_is_fresh() is False
+
+
+@pytest.mark.django_db
+def test_run_once_updates_models_and_marks_flag_fresh(monkeypatch):
+    """Тестируем обновление активности при недоступном Celery и переход запросов на флаг is_active"""
+    monkeypatch.setattr(refresher_mod, "celery_is_healthy", lambda: False)
+    monkeypatch.setattr(query_mod, "celery_is_healthy", lambda: False)
+    obj = TestBaseModel.objects.create(is_active=False, active_start=timezone.now() - timezone.timedelta(days=1))
+
+    results = ActivityRefresher().run_once()
+
+    assert results["default"][TestBaseModel._meta.label_lower] == 1
+    assert activity_is_fresh() is True
+    assert "active_start" not in str(TestBaseModel.objects.active().query).split("WHERE")[1]
+    assert list(TestBaseModel.objects.active()) == [obj]
+
+
+@pytest.mark.django_db
+def test_run_once_does_not_mark_fresh_when_cells_fail(monkeypatch):
+    """Тестируем что при ошибке хотя бы одной ячейки отметка свежести снимается"""
+    monkeypatch.setattr(refresher_mod, "celery_is_healthy", lambda: False)
+    cache.set(refresher_mod.REFRESHED_AT_KEY, 1)
+    monkeypatch.setattr(
+        refresher_mod, "refresh_activity",
+        lambda: {"default": {"app.ok": 1, "app.broken": {"error": "relation does not exist"}}},
+    )
+
+    results = ActivityRefresher().run_once()
+
+    assert results["default"]["app.broken"] == {"error": "relation does not exist"}
+    assert activity_is_fresh() is False
+
+
+@pytest.mark.django_db
+def test_only_leader_refreshes(monkeypatch):
+    """Тестируем что обновление выполняет только один процесс-лидер"""
+    monkeypatch.setattr(refresher_mod, "celery_is_healthy", lambda: False)
+    leader, follower = ActivityRefresher(), ActivityRefresher()
+
+    assert leader.run_once() is not None
+    assert follower.run_once() is None
+    assert leader.run_once() is not None
+
+
+def test_activity_is_fresh_disabled_by_default(settings):
+    """Тестируем что без настройки запросы не полагаются на обновлятель"""
+    settings.BASEMODELS_ACTIVITY_REFRESHER = False
+    cache.set(refresher_mod.REFRESHED_AT_KEY, 1)
+
+    assert activity_is_fresh() is False
+
+
+def test_start_and_stop_background_thread(monkeypatch):
+    """Тестируем запуск и остановку фонового потока"""
+    monkeypatch.setattr(refresher_mod, "celery_is_healthy", lambda: True)
+    refresher = ActivityRefresher(interval=0.01)
+
+    refresher.start()
+    assert refresher._thread.is_alive()
+    refresher.stop(timeout=1)
+    assert refresher._thread is None